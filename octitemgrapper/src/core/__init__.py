@@ -0,0 +1,46 @@
+from __future__ import annotations
+
+# Qt-free recognition core: capture, templates, recognizers, output, sessions,
+# and the local recognition service.
+# Nothing here may import PyQt5. Public names are resolved lazily (PEP 562), so
+# `import core` is cheap and cv2 / mss are only loaded by the modules that use
+# them. core.import_budget checks both properties.
+
+import importlib
+from typing import Any, Dict
+
+_EXPORTS: Dict[str, str] = {
+    "Rect": "geometry",
+    "NRect": "zone_template",
+    "ScreenCapturer": "capture",
+    "TemplateEntry": "templates_loader",
+    "TemplateStore": "templates_loader",
+    "load_templates": "templates_loader",
+    "RecognizedItem": "recognizer",
+    "ORBItemRecognizer": "recognizer",
+    "EmbeddingItemRecognizer": "embedding_recognizer",
+    "EmptySlotDetector": "empty_slot",
+    "OutputWriter": "output_writer",
+    "RecognizerPool": "recognizer_pool",
+    "get_pool": "recognizer_pool",
+    "CaptureSession": "session",
+    "SourceSpec": "session",
+    "Thresholds": "session",
+    "apply_thresholds": "session",
+    "SessionRecorder": "recorder",
+    "SessionReader": "recorder",
+    "MemoryWatcher": "memwatch",
+    "RecognitionService": "service",
+    "RecognitionClient": "service",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name: str) -> Any:
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module}", __name__), name)
+    globals()[name] = value
+    return value
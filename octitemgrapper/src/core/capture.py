@@ -1,32 +1,54 @@
 from __future__ import annotations
 
-from typing import Optional, List, Tuple
+from typing import Any, Callable, Optional, List, Tuple
 
 import numpy as np
-from mss import mss
 
-from roi_selector import Rect
-from scale_utils import get_pixel_scale
+from .geometry import Rect
 
-# Optional window capture on Windows
-try:
-    import win32gui
-    import win32ui
-    import win32con
-    import win32api
-except Exception:  # pragma: no cover
-    win32gui = None
-    win32ui = None
-    win32con = None
-    win32api = None
+# mss and pywin32 are imported on first use, so importing the core does not
+# pay for them (and pywin32 stays optional outside Windows)
+win32gui: Any = None
+win32ui: Any = None
+win32con: Any = None
+_win32_loaded = False
+
+
+def _load_win32() -> None:
+    global win32gui, win32ui, win32con, _win32_loaded
+    if _win32_loaded:
+        return
+    _win32_loaded = True
+    try:
+        import win32gui as _gui
+        import win32ui as _ui
+        import win32con as _con
+    except Exception:  # pragma: no cover
+        return
+    win32gui, win32ui, win32con = _gui, _ui, _con
+
+
+def _new_mss() -> Any:
+    from mss import mss
+
+    return mss()
 
 
 class ScreenCapturer:
-    def __init__(self) -> None:
-        self._sct: Optional[mss] = None
+    # mss handles are per-thread: give every capture worker its own instance.
+    # The core knows nothing about Qt: the GUI passes scale_provider (logical
+    # to physical pixels), workers pass a fixed pixel_scale measured up front.
+    def __init__(
+        self,
+        pixel_scale: Optional[Tuple[float, float]] = None,
+        scale_provider: Optional[Callable[[], Tuple[float, float]]] = None,
+    ) -> None:
+        self._sct: Any = None
+        self.pixel_scale = pixel_scale
+        self.scale_provider = scale_provider
 
     def __enter__(self) -> "ScreenCapturer":
-        self._sct = mss()
+        self._sct = _new_mss()
         return self
 
     def __exit__(self, exc_type, exc, tb) -> None:
@@ -36,7 +58,7 @@ class ScreenCapturer:
 
     def open(self) -> None:
         if self._sct is None:
-            self._sct = mss()
+            self._sct = _new_mss()
 
     def close(self) -> None:
         if self._sct is not None:
@@ -56,7 +78,12 @@ class ScreenCapturer:
         if self._sct is None:
             self.open()
         assert self._sct is not None
-        sx, sy = get_pixel_scale()
+        if self.pixel_scale is not None:
+            sx, sy = self.pixel_scale
+        elif self.scale_provider is not None:
+            sx, sy = self.scale_provider()
+        else:
+            sx, sy = 1.0, 1.0
         bbox = {
             "left": int(round(rect.x * sx)),
             "top": int(round(rect.y * sy)),
@@ -72,6 +99,7 @@ class ScreenCapturer:
     # Window capture (Windows-only)
     def list_windows(self) -> List[Tuple[int, str]]:
         result: List[Tuple[int, str]] = []
+        _load_win32()
         if win32gui is None:
             return result
 
@@ -84,6 +112,7 @@ class ScreenCapturer:
         return result
 
     def grab_window_bgr(self, hwnd: int) -> Optional[np.ndarray]:
+        _load_win32()
         if win32gui is None or win32ui is None:
             return None
         try:
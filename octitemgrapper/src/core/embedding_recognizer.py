@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+from typing import Dict, List, Optional
+
+import cv2
+import numpy as np
+
+from .empty_slot import EMPTY_NAME, EmptySlotDetector
+from .parallel_utils import ProgressFn, map_chunked
+from .recognizer import RecognizedItem
+from .templates_loader import TemplateEntry
+
+
+# Side of the grayscale and colour patches that make up the raw embedding
+GRAY_SIDE = 16
+COLOR_SIDE = 8
+
+
+def embed_bgr(image_bgr: np.ndarray) -> np.ndarray:
+    # Zero-mean, unit-norm gray patch + coarse colour patch; robust to brightness shifts
+    gray = cv2.cvtColor(image_bgr, cv2.COLOR_BGR2GRAY)
+    g = cv2.resize(gray, (GRAY_SIDE, GRAY_SIDE), interpolation=cv2.INTER_AREA).astype(np.float32).ravel()
+    g -= g.mean()
+    gn = float(np.linalg.norm(g))
+    if gn > 0:
+        g /= gn
+    c = cv2.resize(image_bgr, (COLOR_SIDE, COLOR_SIDE), interpolation=cv2.INTER_AREA).astype(np.float32).ravel()
+    c -= c.mean()
+    cn = float(np.linalg.norm(c))
+    if cn > 0:
+        c /= cn
+    vec = np.concatenate([g, c])
+    n = float(np.linalg.norm(vec))
+    if n > 0:
+        vec /= n
+    return vec
+
+
+def _embed_entry(entry: TemplateEntry) -> Optional[np.ndarray]:
+    img = entry.image_bgr
+    if img is None or img.size == 0:
+        return None
+    return embed_bgr(img)
+
+
+# Nearest-neighbour alternative to ORBItemRecognizer: one embedding + one
+# matrix-vector product per crop, independent of keypoint detection.
+class EmbeddingItemRecognizer:
+    def __init__(
+        self,
+        templates: Dict[str, TemplateEntry],
+        pca_dims: Optional[int] = 64,
+        progress: Optional[ProgressFn] = None,
+        workers: Optional[int] = None,
+        empty_detector: Optional[EmptySlotDetector] = None,
+    ) -> None:
+        self.templates = templates
+        self.empty_detector = empty_detector
+        entries = list(templates.values())
+        embedded = map_chunked(_embed_entry, entries, "features", progress, workers=workers)
+        self._names: List[str] = []
+        vecs: List[np.ndarray] = []
+        for entry, vec in zip(entries, embedded):
+            if vec is None:
+                continue
+            self._names.append(entry.name)
+            vecs.append(vec)
+        raw = np.zeros((len(vecs), GRAY_SIDE * GRAY_SIDE + COLOR_SIDE * COLOR_SIDE * 3), dtype=np.float32)
+        for i, vec in enumerate(vecs):
+            raw[i] = vec
+
+        self._mean: Optional[np.ndarray] = None
+        self._components: Optional[np.ndarray] = None
+        # PCA only pays off once there are more templates than target dimensions
+        if pca_dims is not None and len(self._names) > pca_dims:
+            self._mean = raw.mean(axis=0)
+            _u, _s, vt = np.linalg.svd(raw - self._mean, full_matrices=False)
+            self._components = vt[:pca_dims].astype(np.float32)
+        self._matrix = self._project(raw)
+
+    def _project(self, vecs: np.ndarray) -> np.ndarray:
+        if self._components is not None and self._mean is not None:
+            vecs = (vecs - self._mean) @ self._components.T
+        norms = np.linalg.norm(vecs, axis=-1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return (vecs / norms).astype(np.float32)
+
+    def nbytes(self) -> int:
+        total = self._matrix.nbytes
+        if self._components is not None and self._mean is not None:
+            total += self._components.nbytes + self._mean.nbytes
+        return int(total)
+
+    def recognize(self, roi_bgr: np.ndarray) -> RecognizedItem:
+        if not self._names or roi_bgr.size == 0:
+            return RecognizedItem(name="Unknown", score=-1.0, method="emb")
+        if self.empty_detector is not None:
+            std = self.empty_detector.check_gray(cv2.cvtColor(roi_bgr, cv2.COLOR_BGR2GRAY))
+            if std is not None:
+                return RecognizedItem(name=EMPTY_NAME, score=std, method="empty")
+        q = self._project(embed_bgr(roi_bgr)[None, :])[0]
+        sims = self._matrix @ q
+        idx = int(np.argmax(sims))
+        return RecognizedItem(name=self._names[idx], score=float(sims[idx]), method="emb")
+
+    def recognize_batch(self, crops: List[np.ndarray]) -> List[RecognizedItem]:
+        # Same results as recognize() per crop, but one matrix-matrix product
+        # for the whole batch instead of one matrix-vector product per crop
+        results: List[Optional[RecognizedItem]] = [None] * len(crops)
+        rows: List[int] = []
+        vecs: List[np.ndarray] = []
+        for i, crop in enumerate(crops):
+            if not self._names or crop.size == 0:
+                results[i] = RecognizedItem(name="Unknown", score=-1.0, method="emb")
+                continue
+            if self.empty_detector is not None:
+                std = self.empty_detector.check_gray(cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY))
+                if std is not None:
+                    results[i] = RecognizedItem(name=EMPTY_NAME, score=std, method="empty")
+                    continue
+            rows.append(i)
+            vecs.append(embed_bgr(crop))
+        if rows:
+            sims = self._project(np.stack(vecs)) @ self._matrix.T
+            best = np.argmax(sims, axis=1)
+            for r, i in enumerate(rows):
+                idx = int(best[r])
+                results[i] = RecognizedItem(name=self._names[idx], score=float(sims[r, idx]), method="emb")
+        return results  # type: ignore[return-value]
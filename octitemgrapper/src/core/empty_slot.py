@@ -0,0 +1,49 @@
+from __future__ import annotations
+
+from typing import Optional
+
+import cv2
+import numpy as np
+
+EMPTY_NAME = "Empty"
+
+
+class EmptySlotDetector:
+    # Cheap pre-check run before any matching: a slot is empty when its
+    # brightness barely varies and it has almost no edges, or when it matches
+    # the layout's empty-background reference closely enough.
+    def __init__(
+        self,
+        std_max: float = 8.0,
+        edge_max: float = 0.02,
+        reference_bgr: Optional[np.ndarray] = None,
+        reference_min_corr: float = 0.9,
+    ) -> None:
+        self.std_max = std_max
+        self.edge_max = edge_max
+        self.reference_min_corr = reference_min_corr
+        self._reference: Optional[np.ndarray] = None
+        if reference_bgr is not None:
+            self._reference = cv2.cvtColor(reference_bgr, cv2.COLOR_BGR2GRAY)
+
+    def check_gray(self, gray: np.ndarray) -> Optional[float]:
+        # Returns the brightness std of an empty slot, None if it is not empty
+        if gray.size == 0:
+            return 0.0
+        std = float(gray.std())
+        if std <= self.std_max:
+            edges = cv2.Canny(gray, 50, 150)
+            if float(np.count_nonzero(edges)) / edges.size <= self.edge_max:
+                return std
+        if self._reference is not None:
+            ref = cv2.resize(self._reference, (gray.shape[1], gray.shape[0]), interpolation=cv2.INTER_AREA)
+            if float(cv2.matchTemplate(gray, ref, cv2.TM_CCOEFF_NORMED)[0, 0]) >= self.reference_min_corr:
+                return std
+        return None
+
+
+def make_empty_detector(std_max: float, edge_max: float = 0.02, reference_path: str = "") -> Optional[EmptySlotDetector]:
+    reference = cv2.imread(reference_path, cv2.IMREAD_COLOR) if reference_path else None
+    if std_max <= 0 and reference is None:
+        return None
+    return EmptySlotDetector(std_max=std_max, edge_max=edge_max, reference_bgr=reference)
@@ -0,0 +1,11 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+
+@dataclass
+class Rect:
+    x: int
+    y: int
+    width: int
+    height: int
@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+import argparse
+import json
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# Import-time budget of the core, in milliseconds, measured in a fresh
+# interpreter per module (best of several runs). `core` itself must stay
+# nearly free; modules that need numpy/cv2 get room for those and no more.
+BUDGET_MS: Dict[str, float] = {
+    "core": 15.0,
+    "core.geometry": 40.0,
+    "core.zone_template": 40.0,
+    "core.output_writer": 40.0,
+    "core.parallel_utils": 40.0,
+    "core.memwatch": 40.0,
+    "core.capture": 200.0,
+    "core.recorder": 200.0,
+    "core.session": 200.0,
+    "core.templates_loader": 350.0,
+    "core.recognizer": 350.0,
+    "core.embedding_recognizer": 350.0,
+    "core.recognizer_pool": 350.0,
+    "core.service": 350.0,
+}
+
+# Modules that must never be pulled in by importing the core
+FORBIDDEN = ("PyQt5",)
+
+_PROBE = """
+import json, sys, time
+sys.path.insert(0, {src!r})
+t0 = time.perf_counter()
+__import__({module!r})
+dt = (time.perf_counter() - t0) * 1000.0
+print(json.dumps({{"ms": dt, "forbidden": [m for m in {forbidden!r} if m in sys.modules]}}))
+"""
+
+
+def measure(module: str, runs: int = 3) -> Dict[str, object]:
+    src = str(Path(__file__).resolve().parent.parent)
+    best = float("inf")
+    forbidden: List[str] = []
+    for _ in range(runs):
+        code = _PROBE.format(src=src, module=module, forbidden=FORBIDDEN)
+        out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+        data = json.loads(out.stdout.strip().splitlines()[-1])
+        best = min(best, float(data["ms"]))
+        forbidden = list(data["forbidden"])
+    return {"ms": best, "forbidden": forbidden}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Check the import-time budget of the Qt-free core")
+    ap.add_argument("--runs", type=int, default=3)
+    ap.add_argument("--scale", type=float, default=1.0, help="multiply all budgets (slow machines / CI)")
+    args = ap.parse_args(argv)
+
+    failed = False
+    for module, budget in BUDGET_MS.items():
+        res = measure(module, args.runs)
+        limit = budget * args.scale
+        ok = float(res["ms"]) <= limit and not res["forbidden"]
+        failed |= not ok
+        extra = f"  imports {', '.join(res['forbidden'])}" if res["forbidden"] else ""
+        print(f"{'ok  ' if ok else 'FAIL'} {module:28s} {float(res['ms']):7.1f} ms (budget {limit:.0f}){extra}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,208 @@
+from __future__ import annotations
+
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+_SRC_DIR = Path(__file__).resolve().parent.parent
+
+
+def rss_bytes() -> int:
+    # Resident set size of this process without psutil
+    if sys.platform.startswith("linux"):
+        try:
+            with open("/proc/self/statm", "r", encoding="ascii") as f:
+                return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        except Exception:
+            pass
+    if sys.platform == "win32":
+        try:
+            import ctypes
+            from ctypes import wintypes
+
+            class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+                _fields_ = [
+                    ("cb", wintypes.DWORD),
+                    ("PageFaultCount", wintypes.DWORD),
+                    ("PeakWorkingSetSize", ctypes.c_size_t),
+                    ("WorkingSetSize", ctypes.c_size_t),
+                    ("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+                    ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                    ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+                    ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                    ("PagefileUsage", ctypes.c_size_t),
+                    ("PeakPagefileUsage", ctypes.c_size_t),
+                ]
+
+            counters = PROCESS_MEMORY_COUNTERS()
+            counters.cb = ctypes.sizeof(counters)
+            handle = ctypes.windll.kernel32.GetCurrentProcess()
+            if ctypes.windll.psapi.GetProcessMemoryInfo(handle, ctypes.byref(counters), counters.cb):
+                return int(counters.WorkingSetSize)
+        except Exception:
+            pass
+    try:
+        import resource
+
+        # ru_maxrss is the peak, not the current value, but better than nothing
+        return int(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss) * 1024
+    except Exception:
+        return 0
+
+
+def subsystem_of(filename: str) -> str:
+    # Attribute an allocation site to core.<module>, app.<module>, a
+    # third-party package or the standard library
+    path = Path(filename)
+    try:
+        rel = path.resolve().relative_to(_SRC_DIR)
+        parts = rel.with_suffix("").parts
+        if parts and parts[0] == "core":
+            return ".".join(parts[:2])
+        return "app." + ".".join(parts)
+    except Exception:
+        pass
+    parts = path.parts
+    for marker in ("site-packages", "dist-packages"):
+        if marker in parts:
+            idx = parts.index(marker)
+            if idx + 1 < len(parts):
+                return parts[idx + 1].split(".")[0]
+    return "python"
+
+
+@dataclass
+class MemorySample:
+    t: float
+    rss: int
+    traced: int
+
+
+@dataclass
+class MemoryReport:
+    rss_mb: float
+    traced_mb: float
+    growth_mb_per_h: float
+    # (subsystem, allocation site, growth since baseline in KiB), largest first
+    top_sites: List[Tuple[str, str, float]] = field(default_factory=list)
+    by_subsystem_kb: Dict[str, float] = field(default_factory=dict)
+    warning: Optional[str] = None
+
+    def format(self) -> str:
+        lines = [f"RSS {self.rss_mb:.1f} MB, traced {self.traced_mb:.1f} MB, trend {self.growth_mb_per_h:+.1f} MB/h"]
+        if self.warning:
+            lines.append(f"WARNING: {self.warning}")
+        for sub, kb in sorted(self.by_subsystem_kb.items(), key=lambda kv: -kv[1])[:8]:
+            lines.append(f"  {sub:28s} {kb:+10.1f} KiB")
+        for sub, site, kb in self.top_sites:
+            lines.append(f"  [{sub}] {site}: {kb:+.1f} KiB")
+        return "\n".join(lines)
+
+
+def growth_per_hour(samples: List[MemorySample], warmup: int) -> float:
+    # Least-squares slope of RSS over time, ignoring warm-up samples (caches,
+    # pools and pyramids are allowed to fill up first)
+    pts = samples[warmup:]
+    if len(pts) < 3:
+        return 0.0
+    t0 = pts[0].t
+    xs = [p.t - t0 for p in pts]
+    ys = [p.rss / 1e6 for p in pts]
+    mx = sum(xs) / len(xs)
+    my = sum(ys) / len(ys)
+    den = sum((x - mx) ** 2 for x in xs)
+    if den <= 0:
+        return 0.0
+    slope = sum((x - mx) * (y - my) for x, y in zip(xs, ys)) / den
+    return slope * 3600.0
+
+
+class MemoryWatcher:
+    # Diagnostics mode: samples RSS and tracemalloc every interval_s on a
+    # background thread, reports top growing allocation sites per subsystem
+    # against the first sample after warm-up and warns when the steady-state
+    # RSS trend exceeds limit_mb_per_h.
+    def __init__(
+        self,
+        interval_s: float = 30.0,
+        warmup_samples: int = 2,
+        limit_mb_per_h: float = 50.0,
+        top_n: int = 10,
+        nframes: int = 1,
+        on_report: Optional[Callable[[MemoryReport], None]] = None,
+    ) -> None:
+        self.interval_s = interval_s
+        self.warmup_samples = warmup_samples
+        self.limit_mb_per_h = limit_mb_per_h
+        self.top_n = top_n
+        self.nframes = nframes
+        self.on_report = on_report
+        self.samples: List[MemorySample] = []
+        self._baseline: Optional[tracemalloc.Snapshot] = None
+        self._started_tracing = False
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self, thread: bool = True) -> None:
+        # thread=False only starts tracing; the caller then drives sample()
+        # itself, and must not mix the two since both append to samples
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.nframes)
+            self._started_tracing = True
+        if not thread:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="memwatch", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(self.interval_s + 1.0)
+            self._thread = None
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+        self._baseline = None
+
+    def _run(self) -> None:
+        while not self._stop_event.wait(self.interval_s):
+            report = self.sample()
+            if self.on_report is not None:
+                self.on_report(report)
+
+    def sample(self) -> MemoryReport:
+        traced = tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else 0
+        self.samples.append(MemorySample(time.monotonic(), rss_bytes(), traced))
+        report = MemoryReport(
+            rss_mb=self.samples[-1].rss / 1e6,
+            traced_mb=traced / 1e6,
+            growth_mb_per_h=growth_per_hour(self.samples, self.warmup_samples),
+        )
+        if tracemalloc.is_tracing():
+            snap = tracemalloc.take_snapshot().filter_traces(
+                (tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__))
+            )
+            if self._baseline is None or len(self.samples) <= self.warmup_samples:
+                self._baseline = snap
+            else:
+                stats = snap.compare_to(self._baseline, "lineno")
+                for st in stats:
+                    frame = st.traceback[0]
+                    sub = subsystem_of(frame.filename)
+                    report.by_subsystem_kb[sub] = report.by_subsystem_kb.get(sub, 0.0) + st.size_diff / 1024.0
+                for st in stats[: self.top_n]:
+                    frame = st.traceback[0]
+                    report.top_sites.append(
+                        (subsystem_of(frame.filename), f"{Path(frame.filename).name}:{frame.lineno}", st.size_diff / 1024.0)
+                    )
+        if len(self.samples) > self.warmup_samples + 2 and report.growth_mb_per_h > self.limit_mb_per_h:
+            report.warning = (
+                f"steady-state memory growth {report.growth_mb_per_h:.1f} MB/h exceeds {self.limit_mb_per_h:.1f} MB/h"
+            )
+        return report
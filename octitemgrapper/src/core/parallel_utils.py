@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, List, Optional, Sequence, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+# progress(stage, done, total)
+ProgressFn = Callable[[str, int, int], None]
+
+
+def default_workers() -> int:
+    return max(1, min(8, (os.cpu_count() or 2) - 1))
+
+
+def map_chunked(
+    fn: Callable[[T], R],
+    items: Sequence[T],
+    stage: str = "",
+    progress: Optional[ProgressFn] = None,
+    chunk_size: int = 64,
+    workers: Optional[int] = None,
+) -> List[R]:
+    # OpenCV decode/detect calls release the GIL, so a thread pool scales
+    # without pickling images across processes. Result order matches items.
+    total = len(items)
+    results: List[Optional[R]] = [None] * total
+    if progress is not None:
+        progress(stage, 0, total)
+    if total == 0:
+        return []
+
+    def run_chunk(start: int) -> int:
+        end = min(start + chunk_size, total)
+        for i in range(start, end):
+            results[i] = fn(items[i])
+        return end - start
+
+    n_workers = workers or default_workers()
+    done = 0
+    if n_workers <= 1 or total <= chunk_size:
+        for start in range(0, total, chunk_size):
+            done += run_chunk(start)
+            if progress is not None:
+                progress(stage, done, total)
+    else:
+        with ThreadPoolExecutor(max_workers=n_workers) as ex:
+            futures = [ex.submit(run_chunk, start) for start in range(0, total, chunk_size)]
+            for fut in as_completed(futures):
+                done += fut.result()
+                if progress is not None:
+                    progress(stage, done, total)
+    return results  # type: ignore[return-value]
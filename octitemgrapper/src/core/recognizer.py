@@ -0,0 +1,542 @@
+from __future__ import annotations
+
+import threading
+from collections import deque
+from dataclasses import dataclass
+from typing import Deque, Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from .empty_slot import EMPTY_NAME, EmptySlotDetector
+from .parallel_utils import ProgressFn, map_chunked
+from .templates_loader import TemplateEntry, TemplateStore
+
+
+@dataclass
+class RecognizedItem:
+    name: str
+    score: float
+    method: str  # "orb", "corr", "emb" or "empty"
+
+
+KEYPOINT_DTYPE = np.dtype(
+    [("x", np.float32), ("y", np.float32), ("size", np.float32), ("angle", np.float32), ("response", np.float32), ("octave", np.int32)]
+)
+
+
+# ORB draws a different random BRIEF pattern for every patchSize other than 31,
+# so descriptors are only comparable at this patch size; it is never varied
+ORB_PATCH_SIZE = 31
+
+
+@dataclass(frozen=True)
+class OrbSizeClass:
+    max_side: int  # applies to images whose shorter side is below this
+    side: int  # crops and templates of the class are rescaled to this shorter side
+    nfeatures: int
+    nlevels: int
+    edge_threshold: int
+
+
+# Smaller icons get fewer pyramid levels and a smaller border, so ORB finds
+# keypoints on 40 px slots instead of rejecting the whole image as border
+ORB_SIZE_CLASSES: Tuple[OrbSizeClass, ...] = (
+    OrbSizeClass(max_side=48, side=40, nfeatures=150, nlevels=2, edge_threshold=11),
+    OrbSizeClass(max_side=96, side=72, nfeatures=300, nlevels=4, edge_threshold=19),
+    OrbSizeClass(max_side=192, side=144, nfeatures=500, nlevels=6, edge_threshold=31),
+)
+
+
+def orb_size_class(shape: Tuple[int, ...]) -> Optional[OrbSizeClass]:
+    side = min(shape[0], shape[1])
+    for cls in ORB_SIZE_CLASSES:
+        if side < cls.max_side:
+            return cls
+    return None
+
+
+class FrequencyOrder:
+    # Visiting order of templates by how often they were recognized recently
+    # (sliding window) plus optional priors. Priors are relative shares (any
+    # scale, normalised on load) worth prior_hits recognitions in total, so
+    # they order the search until real hits take over.
+    def __init__(self, names: List[str], window: int = 2048, reorder_every: int = 32, prior_hits: float = 64.0) -> None:
+        self._index = {n: i for i, n in enumerate(names)}
+        self._names = names
+        self._counts = np.zeros(len(names), dtype=np.float64)
+        self._priors = np.zeros(len(names), dtype=np.float64)
+        self._recent: Deque[int] = deque(maxlen=window)
+        self._reorder_every = reorder_every
+        self._prior_hits = prior_hits
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._plan = self._make_plan()
+
+    def _make_plan(self) -> np.ndarray:
+        return np.argsort(-(self._counts + self._priors), kind="stable")
+
+    def plan(self) -> np.ndarray:
+        return self._plan
+
+    def set_priors(self, priors: Dict[str, float]) -> None:
+        with self._lock:
+            self._priors[:] = 0.0
+            for name, weight in priors.items():
+                i = self._index.get(name)
+                if i is not None:
+                    self._priors[i] = max(0.0, float(weight))
+            total = float(self._priors.sum())
+            if total > 0:
+                self._priors *= self._prior_hits / total
+            self._plan = self._make_plan()
+
+    def reset(self, priors: Dict[str, float]) -> None:
+        # Forget the recent history, e.g. when a pooled recognizer is handed to
+        # another profile, and start over from that profile's priors
+        with self._lock:
+            self._recent.clear()
+            self._counts[:] = 0.0
+            self._pending = 0
+        self.set_priors(priors)
+
+    def record(self, name: str) -> None:
+        i = self._index.get(name)
+        if i is None:
+            return
+        with self._lock:
+            if len(self._recent) == self._recent.maxlen:
+                self._counts[self._recent[0]] -= 1.0
+            self._recent.append(i)
+            self._counts[i] += 1.0
+            self._pending += 1
+            if self._pending >= self._reorder_every:
+                self._pending = 0
+                self._plan = self._make_plan()
+
+    def snapshot(self) -> Dict[str, float]:
+        # Shares of the recent window only (sum 1, empty before any hit), so
+        # saving and re-loading them as priors does not compound over sessions
+        with self._lock:
+            total = float(len(self._recent))
+            if total == 0:
+                return {}
+            return {self._names[i]: float(c) / total for i, c in enumerate(self._counts) if c > 0}
+
+
+_POPCOUNT = np.unpackbits(np.arange(256, dtype=np.uint8)[:, None], axis=1).sum(axis=1).astype(np.int32)
+
+
+def shared_template_counts(
+    descriptors: np.ndarray,
+    owner: np.ndarray,
+    max_distance: int,
+    tables: int = 10,
+    bits: int = 14,
+    window: int = 8,
+    progress: Optional[ProgressFn] = None,
+    seed: int = 0,
+) -> np.ndarray:
+    # Approximate number of other templates holding a descriptor within
+    # max_distance (Hamming) of each descriptor, in O(N log N) per table
+    # instead of all pairs: bit-sampling LSH puts descriptors into buckets by
+    # `bits` random bits, and each descriptor is verified only against its next
+    # `window` bucket mates (random order inside a bucket). Near pairs at the
+    # default 32 bits collide in at least one of 10 tables ~80% of the time;
+    # descriptors shared by many templates have many chances to be found.
+    n = descriptors.shape[0]
+    counts = np.zeros(n, dtype=np.int32)
+    if n == 0:
+        return counts
+    rng = np.random.default_rng(seed)
+    n_owners = int(owner.max()) + 1
+    found: List[np.ndarray] = []
+    nbits = descriptors.shape[1] * 8
+    for t in range(tables):
+        if progress is not None:
+            progress("prune", t, tables)
+        keys = np.zeros(n, dtype=np.int64)
+        for b in rng.choice(nbits, size=bits, replace=False):
+            keys = (keys << 1) | ((descriptors[:, b >> 3] >> (7 - (b & 7))) & 1)
+        order = np.lexsort((rng.random(n), keys))
+        sorted_keys = keys[order]
+        for shift in range(1, window + 1):
+            same = np.flatnonzero(sorted_keys[:-shift] == sorted_keys[shift:])
+            if same.size == 0:
+                break  # every bucket is smaller than shift
+            a = order[same]
+            b = order[same + shift]
+            other = owner[a] != owner[b]
+            a, b = a[other], b[other]
+            dist = _POPCOUNT[descriptors[a] ^ descriptors[b]].sum(axis=1)
+            a, b = a[dist <= max_distance], b[dist <= max_distance]
+            found.append(a * n_owners + owner[b])
+            found.append(b * n_owners + owner[a])
+    if progress is not None:
+        progress("prune", tables, tables)
+    if found:
+        pairs = np.unique(np.concatenate(found))
+        counts += np.bincount(pairs // n_owners, minlength=n).astype(np.int32)
+    return counts
+
+
+class DescriptorSet:
+    # Template features for one crop size class. Descriptors of all templates
+    # are concatenated into one array; rows of template i are
+    # offsets[i]:offsets[i + 1] (same for keypoints).
+    def __init__(self, features: List[Tuple[list, np.ndarray]]) -> None:
+        kps = []
+        des_list = []
+        self.offsets = np.zeros(len(features) + 1, dtype=np.int64)
+        for i, (kp, des) in enumerate(features):
+            kps.extend(kp)
+            des_list.append(des)
+            self.offsets[i + 1] = self.offsets[i] + des.shape[0]
+        self.keypoints = np.array(kps, dtype=KEYPOINT_DTYPE)
+        self.descriptors = np.concatenate(des_list) if des_list else np.zeros((0, 32), dtype=np.uint8)
+        self._cached: Tuple[Optional[np.ndarray], Optional[np.ndarray]] = (None, None)
+
+    def rows(self, i: int) -> np.ndarray:
+        return self.descriptors[self.offsets[i] : self.offsets[i + 1]]
+
+    def remaining(self, order: np.ndarray) -> np.ndarray:
+        # remaining[k] = best score any of order[k:] could still reach; a
+        # template's descriptor count bounds its good-match count
+        cached_order, cached = self._cached
+        if cached_order is order and cached is not None:
+            return cached
+        bounds = np.diff(self.offsets).astype(np.float64)[order]
+        remaining = np.append(np.maximum.accumulate(bounds[::-1])[::-1], -1.0)
+        self._cached = (order, remaining)
+        return remaining
+
+    def keep(self, rows: np.ndarray, offsets: np.ndarray) -> None:
+        self.descriptors = np.ascontiguousarray(self.descriptors[rows])
+        self.keypoints = self.keypoints[rows]
+        self.offsets = offsets
+        self._cached = (None, None)
+
+    def nbytes(self) -> int:
+        return int(self.descriptors.nbytes + self.keypoints.nbytes + self.offsets.nbytes)
+
+
+@dataclass
+class PruneReport:
+    templates: int
+    before: int
+    after: int
+    shared: int  # descriptors found in at least max_shared other templates
+    capped: int  # distinctive descriptors dropped by the per-template cap
+    restored: int  # shared descriptors kept so no template falls below min_keep
+
+    @property
+    def removed(self) -> int:
+        return self.before - self.after
+
+    def format(self) -> str:
+        pct = 100.0 * self.removed / self.before if self.before else 0.0
+        return (
+            f"{self.templates} templates: {self.before} -> {self.after} descriptors "
+            f"(removed {self.removed}, {pct:.0f}%; shared {self.shared}, capped {self.capped}, restored {self.restored})"
+        )
+
+
+class ORBItemRecognizer:
+    def __init__(
+        self,
+        templates: Dict[str, TemplateEntry],
+        progress: Optional[ProgressFn] = None,
+        workers: Optional[int] = None,
+        nfeatures: int = 500,
+        ratio: float = 0.75,
+        fallback_below: float = 8,
+        fallback_accept: float = 0.5,
+        search: str = "full",
+        early_exit_score: Optional[float] = None,
+        empty_detector: Optional[EmptySlotDetector] = None,
+        adaptive: bool = False,
+        prune: bool = False,
+    ) -> None:
+        self.templates = templates
+        # Pick ORB parameters from the crop size (ORB_SIZE_CLASSES); nfeatures
+        # stays the upper bound of every class. Crops and templates are both
+        # rescaled to the class side and matched only within their class.
+        # Off by default: on small icons the fixed detector finds nothing and
+        # the correlation fallback decides, which is more accurate there; turn
+        # it on where evaluate.py --adaptive 0,1 shows a win.
+        self.adaptive = adaptive
+        # Tunables (see evaluate.py): ORB feature budget, Lowe ratio test,
+        # good-match count under which the correlation fallback is consulted
+        # and the correlation it needs to override ORB
+        self.nfeatures = nfeatures
+        self.ratio = ratio
+        self.fallback_below = fallback_below
+        self.fallback_accept = fallback_accept
+        # "full" scans every template; "frequency" visits templates in order of
+        # recent hits and stops once the best score cannot be beaten by any
+        # remaining template (its descriptor count bounds its good matches), so
+        # it picks the same winner as a full scan. An early_exit_score (e.g. 24)
+        # additionally stops at the first score that high: faster, but no
+        # longer guaranteed to agree with the full scan.
+        self.search = search
+        self.early_exit_score = early_exit_score
+        # Empty slots short-circuit before ORB detection and matching
+        self.empty_detector = empty_detector
+        # cv2.ORB / BFMatcher instances are not safe to share between threads,
+        # so every thread (loader pool, capture workers) gets its own pair
+        self._local = threading.local()
+        self._workers = workers
+        self.store = TemplateStore(templates, progress=progress, workers=workers)
+        self.frequency = FrequencyOrder(self.store.names)
+        # One DescriptorSet per crop size class (None: default detector, native
+        # template size). The class of the median template is built now, since
+        # crops usually have about the size of the templates; others on first use.
+        self._sets: Dict[Optional[OrbSizeClass], DescriptorSet] = {}
+        self._sets_lock = threading.Lock()
+        self._prune_args: Optional[Dict[str, int]] = None
+        self.primary_class: Optional[OrbSizeClass] = None
+        if adaptive and len(self.store):
+            sides = sorted(min(self.store.gray(i).shape[:2]) for i in range(len(self.store)))
+            self.primary_class = orb_size_class((sides[len(sides) // 2],) * 2)
+        self.descriptor_set(self.primary_class, progress)
+        # Optional discriminative pruning with default settings (see prune_descriptors)
+        self.prune_report: Optional[PruneReport] = None
+        if prune:
+            self.prune_report = self.prune_descriptors(progress=progress)
+
+    def _class_key(self, shape: Tuple[int, ...]) -> Optional[OrbSizeClass]:
+        return orb_size_class(shape) if self.adaptive else None
+
+    def _detector(self, cls: Optional[OrbSizeClass]) -> cv2.ORB:
+        # Small per-thread cache: one detector per size class
+        cache: Optional[Dict[Optional[OrbSizeClass], cv2.ORB]] = getattr(self._local, "orbs", None)
+        if cache is None:
+            cache = {}
+            self._local.orbs = cache
+        orb = cache.get(cls)
+        if orb is None:
+            if cls is None:
+                orb = cv2.ORB_create(nfeatures=self.nfeatures)
+            else:
+                orb = cv2.ORB_create(
+                    nfeatures=min(self.nfeatures, cls.nfeatures),
+                    nlevels=cls.nlevels,
+                    edgeThreshold=cls.edge_threshold,
+                    patchSize=ORB_PATCH_SIZE,
+                )
+            cache[cls] = orb
+        return orb
+
+    def _matcher(self) -> cv2.BFMatcher:
+        bf = getattr(self._local, "bf", None)
+        if bf is None:
+            bf = cv2.BFMatcher(cv2.NORM_HAMMING, crossCheck=False)
+            self._local.bf = bf
+        return bf
+
+    @staticmethod
+    def _class_gray(gray: np.ndarray, cls: Optional[OrbSizeClass]) -> np.ndarray:
+        # Templates and crops of a class are both rescaled to its side, so the
+        # class border and pyramid always fit the image they are applied to
+        h, w = gray.shape[:2]
+        if cls is None or min(h, w) == cls.side:
+            return gray
+        scale = cls.side / float(min(h, w))
+        size = (max(1, int(round(w * scale))), max(1, int(round(h * scale))))
+        return cv2.resize(gray, size, interpolation=cv2.INTER_AREA if scale < 1.0 else cv2.INTER_LINEAR)
+
+    def _extract(self, i: int, cls: Optional[OrbSizeClass]) -> Tuple[list, np.ndarray]:
+        kp, des = self._detector(cls).detectAndCompute(self._class_gray(self.store.gray(i), cls), None)
+        if des is None:
+            return [], np.zeros((0, 32), dtype=np.uint8)
+        return [(k.pt[0], k.pt[1], k.size, k.angle, k.response, k.octave) for k in kp], des
+
+    def descriptor_set(self, cls: Optional[OrbSizeClass], progress: Optional[ProgressFn] = None) -> DescriptorSet:
+        dset = self._sets.get(cls)
+        if dset is not None:
+            return dset
+        with self._sets_lock:
+            dset = self._sets.get(cls)
+            if dset is None:
+                indices = list(range(len(self.store)))
+                features = map_chunked(lambda i: self._extract(i, cls), indices, "features", progress, workers=self._workers)
+                dset = DescriptorSet(features)
+                if self._prune_args is not None:
+                    self._prune_set(dset, **self._prune_args)
+                self._sets[cls] = dset
+        return dset
+
+    def prepared(self, shape: Tuple[int, ...]) -> bool:
+        return self._class_key(shape) in self._sets
+
+    def prepare(self, shape: Tuple[int, ...], progress: Optional[ProgressFn] = None) -> None:
+        # Build the template features for crops of this shape ahead of the
+        # first tick instead of on it
+        self.descriptor_set(self._class_key(shape), progress)
+
+    # Features of the primary size class
+    @property
+    def descriptors(self) -> np.ndarray:
+        return self.descriptor_set(self.primary_class).descriptors
+
+    @property
+    def keypoints(self) -> np.ndarray:
+        return self.descriptor_set(self.primary_class).keypoints
+
+    @property
+    def des_offsets(self) -> np.ndarray:
+        return self.descriptor_set(self.primary_class).offsets
+
+    def template_descriptors(self, i: int) -> np.ndarray:
+        return self.descriptor_set(self.primary_class).rows(i)
+
+    def nbytes(self) -> int:
+        return int(self.store.nbytes() + sum(s.nbytes() for s in list(self._sets.values())))
+
+    def _prune_set(
+        self,
+        dset: DescriptorSet,
+        max_distance: int,
+        max_shared: int,
+        per_template: int,
+        min_keep: int,
+        progress: Optional[ProgressFn] = None,
+    ) -> PruneReport:
+        n = len(self.store)
+        before = int(dset.descriptors.shape[0])
+        owner = np.repeat(np.arange(n), np.diff(dset.offsets))
+        shared = shared_template_counts(dset.descriptors, owner, max_distance, progress=progress)
+
+        keep_rows: List[np.ndarray] = []
+        offsets = np.zeros(n + 1, dtype=np.int64)
+        n_shared = n_capped = n_restored = 0
+        for i in range(n):
+            lo, hi = int(dset.offsets[i]), int(dset.offsets[i + 1])
+            rows = np.arange(lo, hi)
+            # Least shared first, then strongest keypoint response
+            rows = rows[np.lexsort((-dset.keypoints["response"][lo:hi], shared[lo:hi]))]
+            distinctive = rows[shared[rows] < max_shared]
+            n_shared += len(rows) - len(distinctive)
+            kept = distinctive[:per_template]
+            n_capped += len(distinctive) - len(kept)
+            if len(kept) < min_keep:
+                extra = rows[len(distinctive) : len(distinctive) + min_keep - len(kept)]
+                n_restored += len(extra)
+                kept = np.concatenate([kept, extra])
+            keep_rows.append(np.sort(kept))
+            offsets[i + 1] = offsets[i] + len(kept)
+
+        dset.keep(np.concatenate(keep_rows) if keep_rows else np.zeros(0, dtype=np.int64), offsets)
+        return PruneReport(
+            templates=n,
+            before=before,
+            after=int(dset.descriptors.shape[0]),
+            shared=n_shared,
+            capped=n_capped,
+            restored=n_restored,
+        )
+
+    def prune_descriptors(
+        self,
+        max_distance: int = 32,
+        max_shared: int = 3,
+        per_template: int = 64,
+        min_keep: int = 16,
+        progress: Optional[ProgressFn] = None,
+    ) -> PruneReport:
+        # Offline step, run before recognition starts: drop descriptors that
+        # (nearly) occur in max_shared or more other templates -- shared frames,
+        # borders and backgrounds that match everywhere -- then keep at most
+        # per_template of the remaining ones, least shared and strongest first.
+        # Templates made only of shared features keep their min_keep least
+        # shared descriptors so ORB can still vote for them. Applies to every
+        # size class built so far and to those built later.
+        args = dict(max_distance=max_distance, max_shared=max_shared, per_template=per_template, min_keep=min_keep)
+        with self._sets_lock:
+            self._prune_args = args
+            reports = [self._prune_set(dset, progress=progress, **args) for dset in self._sets.values()]
+        return PruneReport(
+            templates=len(self.store),
+            before=sum(r.before for r in reports),
+            after=sum(r.after for r in reports),
+            shared=sum(r.shared for r in reports),
+            capped=sum(r.capped for r in reports),
+            restored=sum(r.restored for r in reports),
+        )
+
+    def recognize(self, roi_bgr: np.ndarray) -> RecognizedItem:
+        result = self._recognize(roi_bgr)
+        if result.method != "empty" and result.name != "Unknown":
+            self.frequency.record(result.name)
+        return result
+
+    def _good_matches(self, bf: cv2.BFMatcher, tpl_des: np.ndarray, des: np.ndarray) -> float:
+        if tpl_des.shape[0] == 0:
+            return -1.0
+        matches = bf.knnMatch(tpl_des, des, k=2)
+        good = []
+        # Fewer than two query descriptors leave no second neighbour for the ratio test
+        for pair in matches:
+            if len(pair) == 2 and pair[0].distance < self.ratio * pair[1].distance:
+                good.append(pair[0])
+        return float(len(good))
+
+    def _recognize(self, roi_bgr: np.ndarray) -> RecognizedItem:
+        gray = cv2.cvtColor(roi_bgr, cv2.COLOR_BGR2GRAY)
+        if self.empty_detector is not None:
+            std = self.empty_detector.check_gray(gray)
+            if std is not None:
+                return RecognizedItem(name=EMPTY_NAME, score=std, method="empty")
+        cls = self._class_key(gray.shape)
+        kp, des = self._detector(cls).detectAndCompute(self._class_gray(gray, cls), None)
+        if des is None or len(kp) == 0:
+            return self._fallback_template_match(gray)
+        bf = self._matcher()
+        dset = self.descriptor_set(cls)
+
+        best_name: str = "Unknown"
+        best_score: float = -1.0
+
+        if self.search == "frequency":
+            order = self.frequency.plan()
+            remaining = dset.remaining(order)
+            for pos, i in enumerate(order):
+                score = self._good_matches(bf, dset.rows(int(i)), des)
+                if score > best_score:
+                    best_score = score
+                    best_name = self.store.names[i]
+                if best_score > remaining[pos + 1]:
+                    break
+                if self.early_exit_score is not None and best_score >= self.early_exit_score:
+                    break
+        else:
+            for i, name in enumerate(self.store.names):
+                score = self._good_matches(bf, dset.rows(i), des)
+                if score > best_score:
+                    best_score = score
+                    best_name = name
+
+        # If score too low, try fallback template matching as a second opinion
+        if best_score < self.fallback_below:
+            fb = self._fallback_template_match(gray)
+            # Prefer correlation if it is confident enough
+            if fb.score >= self.fallback_accept:
+                return fb
+        return RecognizedItem(name=best_name, score=best_score, method="orb")
+
+    def _fallback_template_match(self, gray_roi: np.ndarray) -> RecognizedItem:
+        best_name = "Unknown"
+        best_val = -1.0
+        for i, name in enumerate(self.store.names):
+            try:
+                tpl_resized = cv2.resize(
+                    self.store.gray(i), (gray_roi.shape[1], gray_roi.shape[0]), interpolation=cv2.INTER_AREA
+                )
+            except Exception:
+                continue
+            res = cv2.matchTemplate(gray_roi, tpl_resized, cv2.TM_CCOEFF_NORMED)
+            val = float(res[0, 0])
+            if val > best_val:
+                best_val = val
+                best_name = name
+        return RecognizedItem(name=best_name, score=best_val, method="corr")
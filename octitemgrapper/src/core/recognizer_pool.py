@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import hashlib
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from .parallel_utils import ProgressFn
+from .templates_loader import SUPPORTED_EXT, TemplateEntry, load_templates
+
+# factory(templates, progress) -> recognizer exposing nbytes()
+RecognizerFactory = Callable[[Dict[str, TemplateEntry], Optional[ProgressFn]], Any]
+PoolKey = Tuple[str, str, str]
+
+# "orb": ORBItemRecognizer, "emb": EmbeddingItemRecognizer
+RECOGNIZER_KINDS = ("orb", "emb")
+
+
+def build_recognizer(kind: str, templates: Dict[str, TemplateEntry], progress: Optional[ProgressFn] = None) -> Any:
+    if kind == "emb":
+        from .embedding_recognizer import EmbeddingItemRecognizer
+        return EmbeddingItemRecognizer(templates, progress=progress)
+    if kind == "orb":
+        from .recognizer import ORBItemRecognizer
+        return ORBItemRecognizer(templates, progress=progress)
+    raise ValueError(f"unknown recognizer kind {kind!r}")
+
+
+def templates_fingerprint(directory: Path) -> str:
+    # Cheap content fingerprint: file names, sizes and mtimes, no decoding
+    h = hashlib.sha1()
+    for path in sorted(directory.glob("*")):
+        if path.suffix.lower() not in SUPPORTED_EXT:
+            continue
+        try:
+            st = path.stat()
+        except OSError:
+            continue
+        h.update(f"{path.name}\0{st.st_size}\0{st.st_mtime_ns}\n".encode("utf-8"))
+    return h.hexdigest()
+
+
+class RecognizerPool:
+    # Process-wide LRU of built recognizers keyed by (templates dir, recognizer
+    # kind, fingerprint). Least recently used entries are evicted once the
+    # total footprint exceeds max_bytes; the most recent entry is always kept.
+    # Footprints are re-read on every check, since recognizers may grow after
+    # they are pooled (size-adaptive ORB builds feature sets on first use).
+    def __init__(self, max_bytes: int = 512 * 1024 * 1024) -> None:
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[PoolKey, Tuple[Dict[str, TemplateEntry], Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _key(self, directory: Path, kind: str) -> PoolKey:
+        return (str(directory.resolve()), kind, templates_fingerprint(directory))
+
+    def lookup(self, directory: Path, kind: str) -> Optional[Tuple[Dict[str, TemplateEntry], Any]]:
+        key = self._key(directory, kind)
+        with self._lock:
+            hit = self._entries.get(key)
+            if hit is None:
+                return None
+            self._entries.move_to_end(key)
+            self._evict()
+            return hit
+
+    def get(
+        self,
+        directory: Path,
+        kind: str,
+        factory: Optional[RecognizerFactory] = None,
+        progress: Optional[ProgressFn] = None,
+    ) -> Tuple[Dict[str, TemplateEntry], Optional[Any]]:
+        key = self._key(directory, kind)
+        with self._lock:
+            hit = self._entries.get(key)
+            if hit is not None:
+                self._entries.move_to_end(key)
+                self._evict()
+                return hit
+        templates = load_templates(directory)
+        if not templates:
+            return templates, None
+        recognizer = factory(templates, progress) if factory is not None else build_recognizer(kind, templates, progress)
+        with self._lock:
+            # Drop stale fingerprints of the same directory/kind
+            for old in [k for k in self._entries if k[:2] == key[:2] and k != key]:
+                del self._entries[old]
+            self._entries[key] = (templates, recognizer)
+            self._evict()
+        return templates, recognizer
+
+    @staticmethod
+    def _size(recognizer: Any) -> int:
+        return int(recognizer.nbytes()) if hasattr(recognizer, "nbytes") else 0
+
+    def _evict(self) -> None:
+        total = sum(self._size(r) for _t, r in self._entries.values())
+        while total > self.max_bytes and len(self._entries) > 1:
+            _key, (_t, r) = self._entries.popitem(last=False)
+            total -= self._size(r)
+
+    def holds(self, recognizer: Any) -> bool:
+        # Identity check without fingerprinting the templates folder
+        with self._lock:
+            return any(r is recognizer for _t, r in self._entries.values())
+
+    def total_bytes(self) -> int:
+        with self._lock:
+            return sum(self._size(r) for _t, r in self._entries.values())
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+_POOL: Optional[RecognizerPool] = None
+_POOL_LOCK = threading.Lock()
+
+
+def get_pool() -> RecognizerPool:
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is None:
+            _POOL = RecognizerPool()
+        return _POOL
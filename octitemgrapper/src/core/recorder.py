@@ -0,0 +1,156 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import queue
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+import numpy as np
+
+# On-disk layout of a recording directory (all files are append-only):
+#   chunk_00000.bin ...  zlib-compressed raw crops, concatenated
+#   blobs.jsonl          one line per unique crop: hash -> chunk/offset/length/shape
+#   index.jsonl          one line per tick: time, source and the crop hash of every slot
+INDEX_NAME = "index.jsonl"
+BLOBS_NAME = "blobs.jsonl"
+
+
+def crop_hash(crop: np.ndarray) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    h.update(str(crop.shape).encode("ascii"))
+    h.update(np.ascontiguousarray(crop).data)
+    return h.hexdigest()
+
+
+class SessionRecorder:
+    # Crops are handed to a background writer through a bounded queue, so the
+    # tick path only pays for an enqueue. When the writer falls behind, whole
+    # ticks are dropped (and counted) instead of blocking recognition.
+    def __init__(self, out_dir: Path, chunk_bytes: int = 32 * 1024 * 1024, max_pending: int = 256, level: int = 3) -> None:
+        self.out_dir = out_dir
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        self.chunk_bytes = chunk_bytes
+        self.level = level
+        self.dropped_ticks = 0
+        self._stats_lock = threading.Lock()
+        self.stored_blobs = 0
+        self.deduplicated = 0
+        self._known: Set[str] = set()
+        self._chunk_index = 0
+        self._load_existing()
+        self._queue: "queue.Queue[Optional[Tuple[float, str, List[Tuple[str, np.ndarray]]]]]" = queue.Queue(max_pending)
+        self._thread = threading.Thread(target=self._run, name="session-recorder", daemon=True)
+        self._thread.start()
+
+    def _load_existing(self) -> None:
+        blobs = self.out_dir / BLOBS_NAME
+        if blobs.exists():
+            for line in blobs.read_text(encoding="utf-8").splitlines():
+                if line.strip():
+                    entry = json.loads(line)
+                    self._known.add(entry["hash"])
+                    self._chunk_index = max(self._chunk_index, int(entry["chunk"]))
+
+    def _chunk_path(self, index: int) -> Path:
+        return self.out_dir / f"chunk_{index:05d}.bin"
+
+    def record(self, source: str, crops: List[Tuple[str, np.ndarray]], ts: Optional[float] = None) -> bool:
+        # Zone crops are views into the full captured frame; copy them so a
+        # pending tick holds only its slots, not the whole frame
+        owned = [(label, crop if crop.base is None and crop.flags.c_contiguous else crop.copy()) for label, crop in crops]
+        try:
+            self._queue.put_nowait((time.time() if ts is None else ts, source, owned))
+            return True
+        except queue.Full:
+            # record() is called from every capture pipeline thread
+            with self._stats_lock:
+                self.dropped_ticks += 1
+            return False
+
+    def _run(self) -> None:
+        chunk_path = self._chunk_path(self._chunk_index)
+        chunk = chunk_path.open("ab")
+        blobs = (self.out_dir / BLOBS_NAME).open("a", encoding="utf-8")
+        index = (self.out_dir / INDEX_NAME).open("a", encoding="utf-8")
+        try:
+            while True:
+                item = self._queue.get()
+                if item is None:
+                    break
+                ts, source, crops = item
+                slots = []
+                for label, crop in crops:
+                    digest = crop_hash(crop)
+                    if digest in self._known:
+                        self.deduplicated += 1
+                    else:
+                        if chunk.tell() >= self.chunk_bytes:
+                            chunk.close()
+                            self._chunk_index += 1
+                            chunk = self._chunk_path(self._chunk_index).open("ab")
+                        payload = zlib.compress(np.ascontiguousarray(crop).tobytes(), self.level)
+                        offset = chunk.tell()
+                        chunk.write(payload)
+                        entry = {
+                            "hash": digest,
+                            "chunk": self._chunk_index,
+                            "offset": offset,
+                            "length": len(payload),
+                            "shape": list(crop.shape),
+                            "dtype": str(crop.dtype),
+                        }
+                        blobs.write(json.dumps(entry) + "\n")
+                        self._known.add(digest)
+                        self.stored_blobs += 1
+                    slots.append({"label": label, "hash": digest})
+                index.write(json.dumps({"t": ts, "source": source, "slots": slots}, ensure_ascii=False) + "\n")
+                if self._queue.empty():
+                    chunk.flush()
+                    blobs.flush()
+                    index.flush()
+        finally:
+            chunk.close()
+            blobs.close()
+            index.close()
+
+    def close(self, timeout: float = 5.0) -> None:
+        if not self._thread.is_alive():
+            return
+        self._queue.put(None)
+        self._thread.join(timeout)
+
+
+class SessionReader:
+    # Replay side: iterate recorded ticks and decode crops by hash
+    def __init__(self, directory: Path) -> None:
+        self.directory = directory
+        self._blobs: Dict[str, dict] = {}
+        blobs = directory / BLOBS_NAME
+        if blobs.exists():
+            for line in blobs.read_text(encoding="utf-8").splitlines():
+                if line.strip():
+                    entry = json.loads(line)
+                    self._blobs[entry["hash"]] = entry
+
+    def __len__(self) -> int:
+        return len(self._blobs)
+
+    def read_crop(self, digest: str) -> np.ndarray:
+        entry = self._blobs[digest]
+        with (self.directory / f"chunk_{int(entry['chunk']):05d}.bin").open("rb") as f:
+            f.seek(int(entry["offset"]))
+            payload = f.read(int(entry["length"]))
+        return np.frombuffer(zlib.decompress(payload), dtype=np.dtype(entry["dtype"])).reshape(entry["shape"])
+
+    def iter_ticks(self) -> Iterator[dict]:
+        index = self.directory / INDEX_NAME
+        if not index.exists():
+            return
+        with index.open("r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
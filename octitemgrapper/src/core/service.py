@@ -0,0 +1,393 @@
+from __future__ import annotations
+
+import argparse
+import base64
+import json
+import queue
+import sys
+import threading
+import time
+import urllib.request
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+from .parallel_utils import default_workers
+from .recognizer import RecognizedItem
+from .recognizer_pool import RECOGNIZER_KINDS, RecognizerPool, get_pool
+
+# Local recognition service. Clients POST crops to /recognize and get
+# RecognizedItem results back; requests from all clients are merged into
+# micro-batches per (templates dir, recognizer kind). Binds to 127.0.0.1 only
+# and never touches the network beyond the loopback interface.
+#
+#   POST /recognize  {"templates": "<dir>", "kind": "orb"|"emb", "crops": ["<base64 PNG>", ...]}
+#                 -> {"items": [{"name": ..., "score": ..., "method": ...}, ...]}
+#   POST /reload     -> re-check template folders on the next request
+#   GET  /stats      -> batching counters
+DEFAULT_PORT = 8765
+
+BatchKey = Tuple[str, str]  # (templates dir, recognizer kind)
+# handler(key, crops) -> one RecognizedItem per crop, in order
+BatchHandler = Callable[[BatchKey, List[np.ndarray]], List[RecognizedItem]]
+
+
+@dataclass
+class _Pending:
+    key: BatchKey
+    crops: List[np.ndarray]
+    future: "Future[List[RecognizedItem]]" = field(default_factory=Future)
+
+
+@dataclass
+class BatchStats:
+    requests: int = 0
+    crops: int = 0
+    batches: int = 0
+    max_batch_crops: int = 0
+    busy_s: float = 0.0
+
+    def as_dict(self) -> Dict[str, float]:
+        d: Dict[str, float] = asdict(self)
+        d["mean_batch_crops"] = self.crops / self.batches if self.batches else 0.0
+        return d
+
+
+class MicroBatcher:
+    # Single collector thread: takes the first waiting request, then keeps
+    # collecting for at most max_wait_ms or until max_batch crops are queued,
+    # and hands each (templates, kind) group to the handler in one call. Under
+    # light load a request waits at most max_wait_ms; under heavy load batches
+    # fill up immediately and per-crop overhead is amortised.
+    def __init__(self, handler: BatchHandler, max_batch: int = 64, max_wait_ms: float = 5.0) -> None:
+        self.handler = handler
+        self.max_batch = max_batch
+        self.max_wait_ms = max_wait_ms
+        self.stats = BatchStats()
+        self._queue: "queue.Queue[Optional[_Pending]]" = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="recognition-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, key: BatchKey, crops: List[np.ndarray]) -> "Future[List[RecognizedItem]]":
+        pending = _Pending(key, crops)
+        self._queue.put(pending)
+        return pending.future
+
+    def recognize(self, key: BatchKey, crops: List[np.ndarray], timeout: Optional[float] = None) -> List[RecognizedItem]:
+        return self.submit(key, crops).result(timeout)
+
+    def _collect(self, first: _Pending) -> Tuple[List[_Pending], bool]:
+        batch = [first]
+        n = len(first.crops)
+        deadline = time.monotonic() + self.max_wait_ms / 1000.0
+        while n < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                return batch, True
+            batch.append(item)
+            n += len(item.crops)
+        return batch, False
+
+    def _run(self) -> None:
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            batch, stop = self._collect(first)
+            self._process(batch)
+            if stop:
+                return
+
+    def _process(self, batch: List[_Pending]) -> None:
+        t0 = time.perf_counter()
+        groups: Dict[BatchKey, List[_Pending]] = {}
+        for p in batch:
+            groups.setdefault(p.key, []).append(p)
+        for key, pendings in groups.items():
+            crops = [c for p in pendings for c in p.crops]
+            try:
+                results = self.handler(key, crops)
+            except Exception as e:
+                for p in pendings:
+                    p.future.set_exception(e)
+                continue
+            start = 0
+            for p in pendings:
+                p.future.set_result(results[start : start + len(p.crops)])
+                start += len(p.crops)
+        n = sum(len(p.crops) for p in batch)
+        self.stats.requests += len(batch)
+        self.stats.crops += n
+        self.stats.batches += 1
+        self.stats.max_batch_crops = max(self.stats.max_batch_crops, n)
+        self.stats.busy_s += time.perf_counter() - t0
+
+    def close(self, timeout: float = 5.0) -> None:
+        if not self._thread.is_alive():
+            return
+        self._queue.put(None)
+        self._thread.join(timeout)
+
+
+@dataclass
+class _Resolved:
+    templates: int
+    recognizer: Any
+    checked: float
+    refreshing: bool = False
+
+
+class RecognitionService:
+    # Recognizers are resolved once per (templates dir, kind) on the request
+    # thread and cached here, so the batcher thread never globs the templates
+    # folder or builds anything. The folder is re-fingerprinted in the
+    # background every refresh_s seconds (a changed folder is rebuilt by the
+    # pool) or on reload(). Only recognizers the pool still holds are kept, so
+    # its LRU and max_bytes bound this cache too. Recognizers with a
+    # recognize_batch() get the whole group at once, the others are spread
+    # over a thread pool (OpenCV releases the GIL).
+    def __init__(
+        self,
+        pool: Optional[RecognizerPool] = None,
+        max_batch: int = 64,
+        max_wait_ms: float = 5.0,
+        workers: Optional[int] = None,
+        refresh_s: float = 30.0,
+    ) -> None:
+        self.pool = pool or get_pool()
+        self.refresh_s = refresh_s
+        self._resolved: Dict[BatchKey, _Resolved] = {}
+        self._build_locks: Dict[BatchKey, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self._refresher = ThreadPoolExecutor(max_workers=1, thread_name_prefix="recognizer-refresh")
+        self._executor = ThreadPoolExecutor(max_workers=workers or default_workers(), thread_name_prefix="recognize")
+        self.batcher = MicroBatcher(self._run_batch, max_batch=max_batch, max_wait_ms=max_wait_ms)
+
+    def _key(self, templates_dir: Path, kind: str) -> BatchKey:
+        if kind not in RECOGNIZER_KINDS:
+            raise ValueError(f"unknown recognizer kind {kind!r}, expected one of {', '.join(RECOGNIZER_KINDS)}")
+        return (str(templates_dir.resolve()), kind)
+
+    def _load(self, key: BatchKey) -> _Resolved:
+        templates, recognizer = self.pool.get(Path(key[0]), key[1])
+        if recognizer is None:
+            raise LookupError(f"no templates in {key[0]}")
+        return _Resolved(len(templates), recognizer, time.monotonic())
+
+    def _resolve(self, key: BatchKey) -> _Resolved:
+        with self._lock:
+            entry = self._resolved.get(key)
+            if entry is not None and not self.pool.holds(entry.recognizer):
+                del self._resolved[key]
+                entry = None
+            if entry is not None:
+                if not entry.refreshing and time.monotonic() - entry.checked >= self.refresh_s:
+                    entry.refreshing = True
+                    self._refresher.submit(self._refresh, key)
+                return entry
+            build_lock = self._build_locks.setdefault(key, threading.Lock())
+        # First request for this key: built on this request's thread, once
+        with build_lock:
+            with self._lock:
+                entry = self._resolved.get(key)
+            if entry is None:
+                entry = self._load(key)
+                with self._lock:
+                    self._resolved[key] = entry
+                    self._drop_evicted()
+            return entry
+
+    def _drop_evicted(self) -> None:
+        # Called with self._lock held after the pool may have evicted entries
+        for key in [k for k, e in self._resolved.items() if not self.pool.holds(e.recognizer)]:
+            del self._resolved[key]
+            self._build_locks.pop(key, None)
+
+    def _refresh(self, key: BatchKey) -> None:
+        try:
+            entry = self._load(key)
+        except Exception:
+            # Keep serving the previous recognizer; retry after refresh_s
+            with self._lock:
+                old = self._resolved.get(key)
+                if old is not None:
+                    old.checked = time.monotonic()
+                    old.refreshing = False
+            return
+        with self._lock:
+            self._resolved[key] = entry
+            self._drop_evicted()
+
+    def reload(self) -> None:
+        # Forget resolved recognizers; the next request re-checks its folder
+        with self._lock:
+            self._resolved.clear()
+
+    def warm(self, templates_dir: Path, kind: str) -> int:
+        return self._resolve(self._key(templates_dir, kind)).templates
+
+    def _run_batch(self, key: BatchKey, crops: List[np.ndarray]) -> List[RecognizedItem]:
+        with self._lock:
+            entry = self._resolved.get(key)
+        # recognize() resolves the key before submitting; reload() may have
+        # dropped it since, in which case this group pays for one lookup
+        recognizer = entry.recognizer if entry is not None else self._resolve(key).recognizer
+        batch_fn = getattr(recognizer, "recognize_batch", None)
+        if batch_fn is not None:
+            return batch_fn(crops)
+        return list(self._executor.map(recognizer.recognize, crops))
+
+    def recognize(self, templates_dir: Path, kind: str, crops: List[np.ndarray]) -> List[RecognizedItem]:
+        key = self._key(templates_dir, kind)
+        recognizer = self._resolve(key).recognizer
+        # Per-size template features (size-adaptive ORB) are built here on the
+        # request thread, not by the first batch that needs them
+        prepare = getattr(recognizer, "prepare", None)
+        if prepare is not None:
+            for shape in {c.shape[:2] for c in crops}:
+                prepare(shape)
+        return self.batcher.recognize(key, crops)
+
+    def close(self) -> None:
+        self.batcher.close()
+        self._refresher.shutdown(wait=False)
+        self._executor.shutdown(wait=False)
+
+
+def encode_crop(crop: np.ndarray) -> str:
+    ok, buf = cv2.imencode(".png", crop)
+    if not ok:
+        raise ValueError("failed to encode crop")
+    return base64.b64encode(buf.tobytes()).decode("ascii")
+
+
+def decode_crop(data: str) -> np.ndarray:
+    img = cv2.imdecode(np.frombuffer(base64.b64decode(data), dtype=np.uint8), cv2.IMREAD_COLOR)
+    if img is None:
+        raise ValueError("crop is not a decodable image")
+    return img
+
+
+def _make_handler(service: RecognitionService) -> type:
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _reply(self, status: int, payload: Dict[str, Any]) -> None:
+            body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self) -> None:
+            if self.path == "/stats":
+                self._reply(200, service.batcher.stats.as_dict())
+            else:
+                self._reply(404, {"error": "not found"})
+
+        def do_POST(self) -> None:
+            if self.path == "/reload":
+                service.reload()
+                self._reply(200, {"ok": True})
+                return
+            if self.path != "/recognize":
+                self._reply(404, {"error": "not found"})
+                return
+            try:
+                length = int(self.headers.get("Content-Length", "0"))
+                request = json.loads(self.rfile.read(length))
+                templates_dir = Path(request["templates"])
+                kind = str(request.get("kind", "orb"))
+                crops = [decode_crop(c) for c in request["crops"]]
+            except Exception as e:
+                self._reply(400, {"error": f"bad request: {e}"})
+                return
+            try:
+                items = service.recognize(templates_dir, kind, crops)
+            except ValueError as e:
+                self._reply(400, {"error": str(e)})
+                return
+            except LookupError as e:
+                self._reply(404, {"error": str(e)})
+                return
+            except Exception as e:
+                self._reply(500, {"error": str(e)})
+                return
+            self._reply(200, {"items": [asdict(it) for it in items]})
+
+        def log_message(self, format: str, *args: Any) -> None:
+            pass
+
+    return Handler
+
+
+def serve(service: RecognitionService, port: int = DEFAULT_PORT) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(("127.0.0.1", port), _make_handler(service))
+    server.daemon_threads = True
+    return server
+
+
+class RecognitionClient:
+    # Minimal stdlib client for other local tools
+    def __init__(self, url: str = f"http://127.0.0.1:{DEFAULT_PORT}", timeout: float = 30.0) -> None:
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+
+    def recognize(self, crops: Sequence[np.ndarray], templates_dir: Path, kind: str = "orb") -> List[RecognizedItem]:
+        body = json.dumps(
+            {"templates": str(templates_dir), "kind": kind, "crops": [encode_crop(c) for c in crops]}
+        ).encode("utf-8")
+        req = urllib.request.Request(
+            f"{self.url}/recognize", data=body, headers={"Content-Type": "application/json"}, method="POST"
+        )
+        with urllib.request.urlopen(req, timeout=self.timeout) as resp:
+            data = json.loads(resp.read())
+        return [RecognizedItem(**it) for it in data["items"]]
+
+    def stats(self) -> Dict[str, float]:
+        with urllib.request.urlopen(f"{self.url}/stats", timeout=self.timeout) as resp:
+            return json.loads(resp.read())
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Local micro-batching item recognition service")
+    ap.add_argument("--port", type=int, default=DEFAULT_PORT)
+    ap.add_argument("--templates", type=Path, action="append", default=[], help="preload (warm) these template folders")
+    ap.add_argument("--kind", choices=RECOGNIZER_KINDS, default="orb")
+    ap.add_argument("--max-batch", type=int, default=64)
+    ap.add_argument("--max-wait-ms", type=float, default=5.0)
+    ap.add_argument("--workers", type=int, default=None)
+    ap.add_argument("--refresh-s", type=float, default=30.0, help="seconds between template folder checks")
+    args = ap.parse_args(argv)
+
+    service = RecognitionService(
+        max_batch=args.max_batch, max_wait_ms=args.max_wait_ms, workers=args.workers, refresh_s=args.refresh_s
+    )
+    for directory in args.templates:
+        print(f"warm {directory} ({args.kind}): {service.warm(directory, args.kind)} templates")
+    server = serve(service, args.port)
+    print(f"listening on http://127.0.0.1:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,200 @@
+from __future__ import annotations
+
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable, List, Optional, Tuple
+
+import numpy as np
+
+from .capture import ScreenCapturer
+from .geometry import Rect
+from .output_writer import OutputWriter
+from .recorder import SessionRecorder
+from .zone_template import NRect, to_abs, zone_slots
+
+if TYPE_CHECKING:  # keeps cv2 out of the import path of capture-only users
+    from .recognizer import RecognizedItem
+
+
+@dataclass
+class Thresholds:
+    # Plain attributes so GUI updates are picked up by workers without locking
+    orb_min: float = 8.0
+    corr_min: float = 0.5
+
+
+def apply_thresholds(detected: RecognizedItem, thresholds: Thresholds) -> str:
+    if detected.method == "empty":
+        return detected.name
+    if detected.method == "orb":
+        if detected.score < thresholds.orb_min:
+            return "Unknown"
+    else:
+        if detected.score < thresholds.corr_min:
+            return "Unknown"
+    return detected.name
+
+
+@dataclass
+class SourceSpec:
+    name: str
+    kind: str  # "roi", "monitor" or "window"
+    target: Optional[int] = None  # monitor index or hwnd
+    rois: List[Rect] = field(default_factory=list)  # screen rects for "roi"
+    zones: List[NRect] = field(default_factory=list)  # frame-relative zones for "monitor"/"window"
+    slots_per_zone: int = 1
+
+    def output_dirname(self) -> str:
+        return re.sub(r"[^\w.-]+", "_", self.name).strip("_")[:40] or "source"
+
+
+@dataclass
+class SlotResult:
+    label: str
+    name: str
+    method: str
+    score: float
+
+
+@dataclass
+class SourceResult:
+    source: str
+    slots: List[SlotResult]
+    latency_s: float
+    error: Optional[str] = None
+
+    @property
+    def items(self) -> List[str]:
+        return [s.name for s in self.slots]
+
+
+def grab_source_frame(capturer: ScreenCapturer, spec: SourceSpec) -> Optional[np.ndarray]:
+    if spec.kind == "monitor":
+        mons = capturer.list_monitors()
+        if spec.target is not None and 0 <= spec.target < len(mons):
+            return capturer.grab_bgr(mons[spec.target])
+        return None
+    if spec.kind == "window" and spec.target is not None:
+        return capturer.grab_window_bgr(spec.target)
+    return None
+
+
+def source_crops(capturer: ScreenCapturer, spec: SourceSpec) -> List[Tuple[str, np.ndarray]]:
+    if spec.kind == "roi":
+        return [(f"ROI {i + 1}", capturer.grab_bgr(r)) for i, r in enumerate(spec.rois)]
+    frame = grab_source_frame(capturer, spec)
+    if frame is None:
+        return []
+    if not spec.zones:
+        return [("Кадр", frame)]
+    h, w = frame.shape[:2]
+    crops: List[Tuple[str, np.ndarray]] = []
+    for zi, nr in enumerate(spec.zones, start=1):
+        for si, slot in enumerate(zone_slots(to_abs(nr, w, h), spec.slots_per_zone), start=1):
+            crop = frame[slot.y : slot.y + slot.height, slot.x : slot.x + slot.width]
+            if crop.size == 0:
+                continue
+            label = f"Зона {zi}" if spec.slots_per_zone <= 1 else f"Зона {zi}.{si}"
+            crops.append((label, crop))
+    return crops
+
+
+class SourcePipeline(threading.Thread):
+    # One capture -> recognize -> output loop per source. Each pipeline owns its
+    # capturer and writer; the recognizer is shared (recognize() is thread-safe).
+    def __init__(
+        self,
+        spec: SourceSpec,
+        recognizer: Any,
+        thresholds: Thresholds,
+        out_dir: Path,
+        on_result: Callable[[SourceResult], None],
+        interval_s: float = 0.25,
+        pixel_scale: Optional[Tuple[float, float]] = None,
+        recorder: Optional[SessionRecorder] = None,
+    ) -> None:
+        super().__init__(name=f"source-{spec.output_dirname()}", daemon=True)
+        self.spec = spec
+        self.recognizer = recognizer
+        self.thresholds = thresholds
+        self.output = OutputWriter(out_dir / spec.output_dirname())
+        self.on_result = on_result
+        self.interval_s = interval_s
+        self.pixel_scale = pixel_scale
+        self.recorder = recorder
+        self._stop_event = threading.Event()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+
+    def prepare(self, capturer: ScreenCapturer) -> None:
+        # Size-adaptive ORB extracts template features per crop size class;
+        # build them for this source's crops before the first tick
+        prepare = getattr(self.recognizer, "prepare", None)
+        if prepare is None:
+            return
+        for shape in {crop.shape[:2] for _label, crop in source_crops(capturer, self.spec)}:
+            prepare(shape)
+
+    def run_once(self, capturer: ScreenCapturer) -> SourceResult:
+        t0 = time.perf_counter()
+        slots: List[SlotResult] = []
+        crops = source_crops(capturer, self.spec)
+        if self.recorder is not None:
+            self.recorder.record(self.spec.name, crops)
+        for label, crop in crops:
+            detected = self.recognizer.recognize(crop)
+            name = apply_thresholds(detected, self.thresholds)
+            slots.append(SlotResult(label, name, detected.method, detected.score))
+        self.output.write([s.name for s in slots])
+        return SourceResult(self.spec.name, slots, time.perf_counter() - t0)
+
+    def run(self) -> None:
+        with ScreenCapturer(pixel_scale=self.pixel_scale) as capturer:
+            try:
+                self.prepare(capturer)
+            except Exception as e:
+                self.on_result(SourceResult(self.spec.name, [], 0.0, error=str(e)))
+            while not self._stop_event.is_set():
+                started = time.perf_counter()
+                try:
+                    result = self.run_once(capturer)
+                except Exception as e:
+                    result = SourceResult(self.spec.name, [], time.perf_counter() - started, error=str(e))
+                self.on_result(result)
+                self._stop_event.wait(max(0.0, self.interval_s - (time.perf_counter() - started)))
+
+
+class CaptureSession:
+    def __init__(
+        self,
+        specs: List[SourceSpec],
+        recognizer: Any,
+        thresholds: Thresholds,
+        out_dir: Path,
+        on_result: Callable[[SourceResult], None],
+        interval_s: float = 0.25,
+        pixel_scale: Optional[Tuple[float, float]] = None,
+        recorder: Optional[SessionRecorder] = None,
+    ) -> None:
+        self.pipelines = [
+            SourcePipeline(spec, recognizer, thresholds, out_dir, on_result, interval_s, pixel_scale, recorder)
+            for spec in specs
+        ]
+
+    def start(self) -> None:
+        for p in self.pipelines:
+            p.start()
+
+    def stop(self, timeout: float = 2.0) -> None:
+        for p in self.pipelines:
+            p.stop()
+        for p in self.pipelines:
+            if p.is_alive():
+                p.join(timeout)
+
+    def is_running(self) -> bool:
+        return any(p.is_alive() for p in self.pipelines)
@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import cv2
+import numpy as np
+
+from .parallel_utils import ProgressFn, map_chunked
+
+
+SUPPORTED_EXT = {".png", ".jpg", ".jpeg", ".bmp"}
+
+
+class TemplateEntry:
+    # Lightweight record: the full-colour image is decoded from disk on demand
+    # and is not kept around unless it was passed in explicitly.
+    __slots__ = ("name", "path", "_image_bgr")
+
+    def __init__(self, name: str, image_bgr: Optional[np.ndarray] = None, path: Optional[Path] = None) -> None:
+        self.name = name
+        self.path = path
+        self._image_bgr = image_bgr
+
+    @property
+    def image_bgr(self) -> Optional[np.ndarray]:
+        if self._image_bgr is not None:
+            return self._image_bgr
+        if self.path is None:
+            return None
+        return cv2.imread(str(self.path), cv2.IMREAD_COLOR)
+
+    def load_gray(self) -> Optional[np.ndarray]:
+        if self._image_bgr is not None:
+            return cv2.cvtColor(self._image_bgr, cv2.COLOR_BGR2GRAY)
+        if self.path is None:
+            return None
+        return cv2.imread(str(self.path), cv2.IMREAD_GRAYSCALE)
+
+
+class TemplateStore:
+    # All template grays packed into one contiguous uint8 atlas with an offset
+    # table, instead of one ndarray per template.
+    def __init__(
+        self,
+        templates: Dict[str, TemplateEntry],
+        progress: Optional[ProgressFn] = None,
+        workers: Optional[int] = None,
+    ) -> None:
+        entries = list(templates.values())
+        decoded = map_chunked(lambda e: e.load_gray(), entries, "decode", progress, workers=workers)
+        grays: List[np.ndarray] = []
+        self.names: List[str] = []
+        for entry, gray in zip(entries, decoded):
+            if gray is None or gray.size == 0:
+                continue
+            self.names.append(entry.name)
+            grays.append(gray)
+        n = len(grays)
+        self.shapes = np.zeros((n, 2), dtype=np.int32)
+        self.offsets = np.zeros(n + 1, dtype=np.int64)
+        for i, g in enumerate(grays):
+            self.shapes[i] = g.shape[:2]
+            self.offsets[i + 1] = self.offsets[i] + g.size
+        self.atlas = np.empty(int(self.offsets[-1]), dtype=np.uint8)
+        for i, g in enumerate(grays):
+            self.atlas[self.offsets[i] : self.offsets[i + 1]] = g.ravel()
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def gray(self, i: int) -> np.ndarray:
+        h, w = self.shapes[i]
+        return self.atlas[self.offsets[i] : self.offsets[i + 1]].reshape(int(h), int(w))
+
+    def nbytes(self) -> int:
+        return int(self.atlas.nbytes + self.shapes.nbytes + self.offsets.nbytes)
+
+
+def load_templates(directory: Path) -> Dict[str, TemplateEntry]:
+    templates: Dict[str, TemplateEntry] = {}
+    for path in sorted(directory.glob("*")):
+        if path.suffix.lower() not in SUPPORTED_EXT:
+            continue
+        # Only check that a decoder exists; pixels are decoded by the consumer
+        if not cv2.haveImageReader(str(path)):
+            continue
+        name = path.stem
+        templates[name] = TemplateEntry(name=name, path=path)
+    return templates
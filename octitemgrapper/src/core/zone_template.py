@@ -3,7 +3,7 @@ from __future__ import annotations
 from dataclasses import dataclass
 from typing import List
 
-from roi_selector import Rect
+from .geometry import Rect
 
 
 @dataclass
@@ -32,6 +32,16 @@ def from_abs(r: Rect, width: int, height: int) -> NRect:
     )
 
 
+def zone_slots(zone: Rect, count: int = 6) -> List[Rect]:
+    # Split a zone into equal horizontal slots with a small padding
+    if count <= 1:
+        return [zone]
+    pad = int(0.04 * min(zone.width, zone.height))
+    slot_w = max(1, (zone.width - 2 * pad) // count)
+    slot_h = max(1, zone.height - 2 * pad)
+    return [Rect(x=zone.x + pad + s * slot_w, y=zone.y + pad, width=slot_w, height=slot_h) for s in range(count)]
+
+
 def default_10(width: int, height: int) -> List[NRect]:
     # Place 10 equal squares across a centered row
     margin_x = 0.02
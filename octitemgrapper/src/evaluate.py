@@ -0,0 +1,212 @@
+from __future__ import annotations
+
+import argparse
+import csv
+import itertools
+import sys
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+from core.recognizer import ORBItemRecognizer, RecognizedItem, orb_size_class
+from core.session import Thresholds, apply_thresholds
+from core.templates_loader import SUPPORTED_EXT, load_templates
+
+
+# Labelled crops: <crops>/<label>/*.png, or <crops>/<label>__<anything>.png.
+# Use the label "Unknown" for crops that must not be recognized.
+def load_labelled_crops(directory: Path) -> List[Tuple[str, np.ndarray]]:
+    samples: List[Tuple[str, np.ndarray]] = []
+    for path in sorted(directory.rglob("*")):
+        if path.suffix.lower() not in SUPPORTED_EXT:
+            continue
+        if path.parent != directory:
+            label = path.parent.name
+        else:
+            label = path.stem.split("__", 1)[0]
+        img = cv2.imread(str(path), cv2.IMREAD_COLOR)
+        if img is None:
+            continue
+        samples.append((label, img))
+    return samples
+
+
+@dataclass
+class EvalResult:
+    adaptive: bool
+    prune: bool
+    nfeatures: int
+    ratio: float
+    fallback_below: float
+    orb_min: float
+    corr_min: float
+    accuracy: float
+    unknown_rate: float
+    latency_ms: float
+    latency_p95_ms: float
+    pareto: bool = False
+
+
+def _parse_list(value: str, cast) -> List:
+    return [cast(v) for v in value.split(",") if v.strip()]
+
+
+def run_config(
+    recognizer: ORBItemRecognizer, samples: Sequence[Tuple[str, np.ndarray]]
+) -> Tuple[List[RecognizedItem], np.ndarray]:
+    detections: List[RecognizedItem] = []
+    latencies = np.zeros(len(samples), dtype=np.float64)
+    for i, (_label, img) in enumerate(samples):
+        t0 = time.perf_counter()
+        detections.append(recognizer.recognize(img))
+        latencies[i] = time.perf_counter() - t0
+    return detections, latencies
+
+
+def mark_pareto(results: List[EvalResult]) -> None:
+    # A configuration is Pareto-optimal if no other one is at least as
+    # accurate and at least as fast while being strictly better in one
+    for r in results:
+        r.pareto = not any(
+            o is not r
+            and o.accuracy >= r.accuracy
+            and o.latency_ms <= r.latency_ms
+            and (o.accuracy > r.accuracy or o.latency_ms < r.latency_ms)
+            for o in results
+        )
+
+
+def effective_nfeatures(nfeatures: int, adaptive: bool, shapes: Sequence[Tuple[int, ...]]) -> Tuple[int, ...]:
+    # Feature budget each size class present in the crops really gets; with
+    # adaptive ORB a class caps nfeatures, so larger values can be identical
+    if not adaptive:
+        return (nfeatures,)
+    classes = {orb_size_class(shape) for shape in shapes}
+    return tuple(sorted(nfeatures if cls is None else min(nfeatures, cls.nfeatures) for cls in classes))
+
+
+def sweep(
+    templates_dir: Path,
+    samples: Sequence[Tuple[str, np.ndarray]],
+    nfeatures: Sequence[int],
+    ratios: Sequence[float],
+    fallback_below: Sequence[float],
+    orb_mins: Sequence[float],
+    corr_mins: Sequence[float],
+    adaptive: Sequence[bool] = (False,),
+    prune: Sequence[bool] = (False,),
+) -> List[EvalResult]:
+    templates = load_templates(templates_dir)
+    labels = [label for label, _img in samples]
+    results: List[EvalResult] = []
+    shapes = [img.shape for _label, img in samples]
+    seen = set()
+    for ad, pr, nf in itertools.product(adaptive, prune, nfeatures):
+        budget = (ad, pr, effective_nfeatures(nf, ad, shapes))
+        if budget in seen:
+            print(f"skip nfeatures={nf} (adaptive={int(ad)}): same per-class budget {budget[2]} as an earlier value")
+            continue
+        seen.add(budget)
+        recognizer = ORBItemRecognizer(templates, nfeatures=nf, adaptive=ad, prune=pr)
+        if recognizer.prune_report is not None:
+            print(f"prune (adaptive={int(ad)}, nfeatures={nf}): {recognizer.prune_report.format()}")
+        # Features of every sample size class are built before timing starts
+        for shape in {s[:2] for s in shapes}:
+            recognizer.prepare(shape)
+        for ratio, fb in itertools.product(ratios, fallback_below):
+            recognizer.ratio = ratio
+            recognizer.fallback_below = fb
+            detections, latencies = run_config(recognizer, samples)
+            lat_ms = float(latencies.mean() * 1000.0) if len(latencies) else 0.0
+            p95_ms = float(np.percentile(latencies, 95) * 1000.0) if len(latencies) else 0.0
+            # UI thresholds are applied after recognition, so they need no re-run
+            for orb_min, corr_min in itertools.product(orb_mins, corr_mins):
+                th = Thresholds(orb_min=orb_min, corr_min=corr_min)
+                names = [apply_thresholds(d, th) for d in detections]
+                n = max(1, len(names))
+                results.append(
+                    EvalResult(
+                        adaptive=ad,
+                        prune=pr,
+                        nfeatures=nf,
+                        ratio=ratio,
+                        fallback_below=fb,
+                        orb_min=orb_min,
+                        corr_min=corr_min,
+                        accuracy=sum(p == t for p, t in zip(names, labels)) / n,
+                        unknown_rate=sum(p == "Unknown" for p in names) / n,
+                        latency_ms=lat_ms,
+                        latency_p95_ms=p95_ms,
+                    )
+                )
+    mark_pareto(results)
+    return results
+
+
+def pick_fastest(results: Sequence[EvalResult], target_accuracy: float) -> Optional[EvalResult]:
+    ok = [r for r in results if r.accuracy >= target_accuracy]
+    if not ok:
+        return None
+    return min(ok, key=lambda r: (r.latency_ms, -r.accuracy, r.unknown_rate))
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Sweep recognizer settings over a labelled folder of crops")
+    ap.add_argument("--templates", type=Path, required=True)
+    ap.add_argument("--crops", type=Path, required=True)
+    ap.add_argument("--adaptive", default="0", help="size-adaptive ORB: 0, 1 or 0,1 to compare")
+    ap.add_argument("--prune", default="0", help="discriminative descriptor pruning: 0, 1 or 0,1 to compare")
+    ap.add_argument("--nfeatures", default="250,500,1000")
+    ap.add_argument("--ratio", default="0.7,0.75,0.8")
+    ap.add_argument("--fallback-below", default="4,8,16")
+    ap.add_argument("--orb-min", default="4,8,12")
+    ap.add_argument("--corr-min", default="0.4,0.5,0.6,0.7")
+    ap.add_argument("--target-accuracy", type=float, default=0.95)
+    ap.add_argument("--csv", type=Path, default=None, help="write all configurations to this CSV file")
+    args = ap.parse_args(argv)
+
+    samples = load_labelled_crops(args.crops)
+    if not samples:
+        print(f"No labelled crops found in {args.crops}", file=sys.stderr)
+        return 1
+    results = sweep(
+        args.templates,
+        samples,
+        _parse_list(args.nfeatures, int),
+        _parse_list(args.ratio, float),
+        _parse_list(args.fallback_below, float),
+        _parse_list(args.orb_min, float),
+        _parse_list(args.corr_min, float),
+        [bool(int(v)) for v in _parse_list(args.adaptive, str)],
+        [bool(int(v)) for v in _parse_list(args.prune, str)],
+    )
+
+    if args.csv is not None:
+        with args.csv.open("w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=list(asdict(results[0]).keys()))
+            writer.writeheader()
+            for r in results:
+                writer.writerow(asdict(r))
+
+    print(f"{len(samples)} crops, {len(results)} configurations")
+    print("Pareto-optimal (accuracy vs latency):")
+    print("  adapt prune nfeat ratio fb_below orb_min corr_min  acc    unk    ms     p95ms")
+    for r in sorted((r for r in results if r.pareto), key=lambda r: r.latency_ms):
+        print(
+            f"  {int(r.adaptive):5d} {int(r.prune):5d} {r.nfeatures:5d} {r.ratio:5.2f} {r.fallback_below:8.1f} {r.orb_min:7.1f} {r.corr_min:8.2f}"
+            f"  {r.accuracy:.3f}  {r.unknown_rate:.3f}  {r.latency_ms:5.2f}  {r.latency_p95_ms:5.2f}"
+        )
+    best = pick_fastest(results, args.target_accuracy)
+    if best is None:
+        print(f"No configuration reaches accuracy {args.target_accuracy:.3f}")
+        return 2
+    print(f"Fastest with accuracy >= {args.target_accuracy:.3f}: {asdict(best)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
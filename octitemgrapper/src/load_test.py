@@ -0,0 +1,275 @@
+from __future__ import annotations
+
+import argparse
+import csv
+import os
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Optional
+
+import cv2
+import numpy as np
+
+from core.empty_slot import EmptySlotDetector
+from core.geometry import Rect
+from core.recognizer_pool import build_recognizer
+from core.session import SourcePipeline, SourceResult, SourceSpec, Thresholds
+from core.templates_loader import load_templates
+from core.zone_template import NRect
+from soak_memory import make_templates
+
+# End-to-end load test of the tick path: a synthetic 1080p "screen" with known
+# icons in a grid of slots is driven through the same SourcePipeline.run_once
+# the app uses (capture -> crops -> recognize -> thresholds -> output), plus a
+# preview step equivalent to the GUI one (BGR->RGB + smooth downscale), on a
+# fixed-rate schedule. Reports end-to-end latency, missed and late ticks, CPU
+# use and accuracy against the rendered ground truth.
+
+
+class SyntheticScreen:
+    # Stands in for ScreenCapturer: one monitor whose contents are re-rendered
+    # by render() before every tick
+    def __init__(
+        self,
+        icons: List[np.ndarray],
+        names: List[str],
+        slots: int,
+        icon_size: int,
+        width: int = 1920,
+        height: int = 1080,
+        change_rate: float = 0.2,
+        empty_rate: float = 0.0,
+        seed: int = 0,
+    ) -> None:
+        self.width = width
+        self.height = height
+        self.icon_size = icon_size
+        self.change_rate = change_rate
+        self.empty_rate = empty_rate
+        self.names = names
+        self._icons = [cv2.resize(img, (icon_size, icon_size), interpolation=cv2.INTER_AREA) for img in icons]
+        self._rng = np.random.default_rng(seed)
+        rng = np.random.default_rng(seed + 1)
+        noise = rng.integers(0, 24, size=(height, width, 1), dtype=np.uint8)
+        self._background = np.repeat(noise, 3, axis=2) + np.uint8(20)
+        self.frame = self._background.copy()
+        self.slot_rects = self._layout(slots)
+        self.truth: List[str] = ["Unknown"] * slots
+        self._current = [-1] * slots
+
+    def _layout(self, slots: int) -> List[Rect]:
+        # Rows of icons across the lower part of the screen, like inventory bars
+        cell = self.icon_size + self.icon_size // 4
+        per_row = max(1, min(slots, (self.width - 2 * cell) // cell))
+        rows = (slots + per_row - 1) // per_row
+        if rows * cell > self.height:
+            raise ValueError(f"{slots} slots of {self.icon_size}px do not fit into {self.width}x{self.height}")
+        x0 = (self.width - per_row * cell) // 2
+        y0 = max(0, self.height - cell * (rows + 1))
+        return [
+            Rect(x=x0 + (i % per_row) * cell, y=y0 + (i // per_row) * cell, width=self.icon_size, height=self.icon_size)
+            for i in range(slots)
+        ]
+
+    def zones(self) -> List[NRect]:
+        return [
+            NRect(r.x / self.width, r.y / self.height, r.width / self.width, r.height / self.height) for r in self.slot_rects
+        ]
+
+    def render(self) -> None:
+        for i, r in enumerate(self.slot_rects):
+            # -1: never drawn, -2: empty, otherwise the index of the drawn icon
+            if self._current[i] != -1 and self._rng.random() >= self.change_rate:
+                continue
+            if self._rng.random() < self.empty_rate:
+                self._current[i] = -2
+                self.frame[r.y : r.y + r.height, r.x : r.x + r.width] = self._background[r.y : r.y + r.height, r.x : r.x + r.width]
+                self.truth[i] = "Empty"
+            else:
+                k = int(self._rng.integers(0, len(self._icons)))
+                self._current[i] = k
+                self.frame[r.y : r.y + r.height, r.x : r.x + r.width] = self._icons[k]
+                self.truth[i] = self.names[k]
+
+    # ScreenCapturer interface used by the session code
+    def list_monitors(self) -> List[Rect]:
+        return [Rect(x=0, y=0, width=self.width, height=self.height)]
+
+    def grab_bgr(self, rect: Rect) -> np.ndarray:
+        return self.frame[rect.y : rect.y + rect.height, rect.x : rect.x + rect.width].copy()
+
+    def grab_window_bgr(self, hwnd: int) -> Optional[np.ndarray]:
+        return None
+
+
+def preview(frame_bgr: np.ndarray, size: tuple = (640, 360)) -> np.ndarray:
+    # Same work as MainWindow.update_preview without Qt: RGB copy + smooth scale
+    rgb = frame_bgr[..., ::-1].copy()
+    return cv2.resize(rgb, size, interpolation=cv2.INTER_LINEAR)
+
+
+@dataclass
+class TickRecord:
+    index: int
+    scheduled: float
+    started: float
+    finished: float
+    correct: int
+    slots: int
+    error: Optional[str] = None
+
+    @property
+    def latency_ms(self) -> float:
+        # From the moment the tick was due until its output and preview are done
+        return (self.finished - self.scheduled) * 1000.0
+
+
+def summarize(records: List[TickRecord], missed: int, period: float, cpu_s: float, wall_s: float) -> str:
+    if not records:
+        return "no ticks"
+    lat = np.array([r.latency_ms for r in records])
+    late = sum(1 for r in records if r.finished > r.scheduled + period)
+    errors = sum(1 for r in records if r.error)
+    correct = sum(r.correct for r in records)
+    slots = max(1, sum(r.slots for r in records))
+    cpu = 100.0 * cpu_s / wall_s if wall_s > 0 else 0.0
+    return (
+        f"ticks {len(records)}, missed {missed}, late {late}, errors {errors} | "
+        f"latency p50 {np.percentile(lat, 50):.1f} p95 {np.percentile(lat, 95):.1f} "
+        f"p99 {np.percentile(lat, 99):.1f} max {lat.max():.1f} ms | "
+        f"CPU {cpu:.0f}% ({cpu / (os.cpu_count() or 1):.0f}% of {os.cpu_count()} cores) | "
+        f"accuracy {correct / slots:.3f}"
+    )
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Synthetic end-to-end load test of the capture/recognize/output tick")
+    ap.add_argument("--slots", type=int, default=60)
+    ap.add_argument("--hz", type=float, default=10.0)
+    ap.add_argument("--duration", type=float, default=60.0, help="seconds")
+    ap.add_argument("--kind", choices=("orb", "emb"), default="orb")
+    ap.add_argument("--prune", action="store_true", help="discriminative descriptor pruning (ORB only)")
+    ap.add_argument("--templates", type=Path, default=None, help="real template folder (default: synthetic icons)")
+    ap.add_argument("--synthetic-templates", type=int, default=100)
+    ap.add_argument("--icon-size", type=int, default=48)
+    ap.add_argument("--change-rate", type=float, default=0.2, help="share of slots that change per tick")
+    ap.add_argument("--empty-rate", type=float, default=0.0)
+    ap.add_argument("--report-every", type=float, default=10.0, help="seconds between interim reports")
+    ap.add_argument("--max-late-frac", type=float, default=0.01, help="fail if more ticks than this are late or missed")
+    ap.add_argument("--csv", type=Path, default=None, help="write one row per tick")
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tpl_dir = args.templates
+        if tpl_dir is None:
+            tpl_dir = Path(tmp) / "templates"
+            tpl_dir.mkdir()
+            make_templates(tpl_dir, args.synthetic_templates, args.icon_size, args.seed)
+        templates = load_templates(tpl_dir)
+        if not templates:
+            print(f"No templates in {tpl_dir}", file=sys.stderr)
+            return 2
+        names = list(templates)
+        screen = SyntheticScreen(
+            [templates[n].image_bgr for n in names],
+            names,
+            args.slots,
+            args.icon_size,
+            change_rate=args.change_rate,
+            empty_rate=args.empty_rate,
+            seed=args.seed,
+        )
+        recognizer = build_recognizer(args.kind, templates)
+        if args.kind == "orb":
+            # Extract template features for the slot size before the clock starts
+            recognizer.prepare((args.icon_size, args.icon_size))
+        if args.prune and args.kind == "orb":
+            print("prune: " + recognizer.prune_descriptors().format())
+        if args.empty_rate > 0:
+            # The synthetic background passes the default flat-slot check
+            recognizer.empty_detector = EmptySlotDetector()
+        spec = SourceSpec(name="synthetic", kind="monitor", target=0, zones=screen.zones())
+        pipeline = SourcePipeline(spec, recognizer, Thresholds(), Path(tmp) / "output", on_result=lambda r: None)
+        monitor = screen.list_monitors()[0]
+
+        period = 1.0 / args.hz
+        records: List[TickRecord] = []
+        missed = 0
+        t_start = time.perf_counter()
+        cpu_start = time.process_time()
+        next_report = t_start + args.report_every
+        report_from = 0
+        report_missed = 0
+        report_cpu = cpu_start
+        report_t = t_start
+        tick = 0
+        while True:
+            scheduled = t_start + tick * period
+            if scheduled - t_start >= args.duration:
+                break
+            now = time.perf_counter()
+            if now < scheduled:
+                time.sleep(scheduled - now)
+            elif now >= scheduled + period:
+                # Already a whole period behind: skip the ticks we cannot serve
+                skip = int((now - scheduled) // period)
+                missed += skip
+                tick += skip
+                continue
+            started = time.perf_counter()
+            screen.render()
+            truth = list(screen.truth)
+            try:
+                result: SourceResult = pipeline.run_once(screen)  # type: ignore[arg-type]
+                preview(screen.grab_bgr(monitor))
+                correct = sum(p == t for p, t in zip(result.items, truth))
+                error = None
+            except Exception as e:
+                correct, error = 0, str(e)
+            records.append(TickRecord(tick, scheduled, started, time.perf_counter(), correct, len(truth), error))
+            tick += 1
+            now = time.perf_counter()
+            if now >= next_report:
+                cpu_now = time.process_time()
+                print(
+                    f"[{now - t_start:6.1f}s] "
+                    + summarize(records[report_from:], missed - report_missed, period, cpu_now - report_cpu, now - report_t)
+                )
+                report_from, report_missed, report_cpu, report_t = len(records), missed, cpu_now, now
+                next_report = now + args.report_every
+        wall = time.perf_counter() - t_start
+        cpu = time.process_time() - cpu_start
+
+    if args.csv is not None:
+        with args.csv.open("w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(["tick", "latency_ms", "busy_ms", "late", "correct", "slots", "error"])
+            for r in records:
+                writer.writerow(
+                    [
+                        r.index,
+                        f"{r.latency_ms:.2f}",
+                        f"{(r.finished - r.started) * 1000.0:.2f}",
+                        int(r.finished > r.scheduled + period),
+                        r.correct,
+                        r.slots,
+                        r.error or "",
+                    ]
+                )
+
+    late = sum(1 for r in records if r.finished > r.scheduled + period)
+    due = len(records) + missed
+    print(f"{args.slots} slots at {args.hz:g} Hz for {args.duration:g} s ({args.kind}):")
+    print("  " + summarize(records, missed, period, cpu, wall))
+    frac = (late + missed) / due if due else 0.0
+    verdict = "OK" if frac <= args.max_late_frac else "OVERLOADED"
+    print(f"  late or missed: {100.0 * frac:.1f}% of {due} due ticks (limit {100.0 * args.max_late_frac:.1f}%) -> {verdict}")
+    return 0 if verdict == "OK" else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
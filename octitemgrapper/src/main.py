@@ -2,22 +2,33 @@ from __future__ import annotations
 
 import sys
 import os
+import time
 from dataclasses import dataclass
 from pathlib import Path
-from typing import List, Optional, Tuple
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Tuple, Union
 
 import numpy as np
 from PyQt5 import QtCore, QtGui, QtWidgets
 import PyQt5  # new: for locating plugins folder
 
-from roi_selector import select_roi, Rect
-from capture import ScreenCapturer
-from templates_loader import load_templates
-from recognizer import ORBItemRecognizer
-from output_writer import OutputWriter
+from core.capture import ScreenCapturer
+from core.geometry import Rect
+from core.memwatch import MemoryReport, MemoryWatcher
+from core.output_writer import OutputWriter
+from core.recorder import SessionRecorder
+from core.session import CaptureSession, SourceResult, SourceSpec, Thresholds, apply_thresholds
+from roi_selector import select_roi
+from results_model import ResultRow, ResultsTableModel
 from profile import Profile
+from scale_utils import get_pixel_scale
 from theme import apply_dark_theme
 
+if TYPE_CHECKING:
+    # cv2-backed modules are imported on first use to keep startup fast
+    from core.embedding_recognizer import EmbeddingItemRecognizer
+    from core.recognizer import ORBItemRecognizer
+    from core.templates_loader import TemplateEntry
+
 
 @dataclass
 class ROIEntry:
@@ -25,6 +36,67 @@ class ROIEntry:
     label: str = ""
 
 
+Recognizer = Union["ORBItemRecognizer", "EmbeddingItemRecognizer"]
+
+STAGE_LABELS = {"decode": "Декодирование шаблонов", "features": "Извлечение признаков"}
+
+
+class SessionBridge(QtCore.QObject):
+    # Carries results from capture worker threads to the GUI thread (queued)
+    result = QtCore.pyqtSignal(object)
+    memory_report = QtCore.pyqtSignal(object)
+
+
+class RecognizerBuildThread(QtCore.QThread):
+    # Loads templates (if only a directory is given) and builds the recognizer
+    # off the GUI thread; progress is forwarded through a queued signal.
+    progress = QtCore.pyqtSignal(str, int, int)
+    built = QtCore.pyqtSignal(object, object)
+    failed = QtCore.pyqtSignal(str)
+
+    def __init__(self, kind: str, templates_dir: Optional[Path], templates: Dict[str, TemplateEntry], parent: Optional[QtCore.QObject] = None) -> None:
+        super().__init__(parent)
+        self.kind = kind
+        self.templates_dir = templates_dir
+        self.templates = templates
+
+    def run(self) -> None:
+        try:
+            from core.recognizer_pool import build_recognizer, get_pool
+            if self.templates_dir is not None:
+                templates, recognizer = get_pool().get(self.templates_dir, self.kind, progress=self.progress.emit)
+                self.built.emit(templates, recognizer)
+                return
+            templates = self.templates
+            if not templates:
+                self.built.emit({}, None)
+                return
+            self.built.emit(templates, build_recognizer(self.kind, templates, self.progress.emit))
+        except Exception as e:
+            self.failed.emit(str(e))
+
+
+class RecognizerPrepareThread(QtCore.QThread):
+    # Builds the template features a recognizer needs for the given crop
+    # shapes (size-adaptive ORB: one set per size class) off the GUI thread
+    progress = QtCore.pyqtSignal(str, int, int)
+    prepared = QtCore.pyqtSignal()
+    failed = QtCore.pyqtSignal(str)
+
+    def __init__(self, recognizer: "ORBItemRecognizer", shapes: List[Tuple[int, int]], parent: Optional[QtCore.QObject] = None) -> None:
+        super().__init__(parent)
+        self.recognizer = recognizer
+        self.shapes = shapes
+
+    def run(self) -> None:
+        try:
+            for shape in self.shapes:
+                self.recognizer.prepare(shape, self.progress.emit)
+            self.prepared.emit()
+        except Exception as e:
+            self.failed.emit(str(e))
+
+
 class MainWindow(QtWidgets.QMainWindow):
     def __init__(self) -> None:
         super().__init__()
@@ -34,9 +106,27 @@ class MainWindow(QtWidgets.QMainWindow):
         self.templates_dir: Optional[Path] = None
         self.rois: List[ROIEntry] = []
 
-        self.capturer = ScreenCapturer()
+        self.capturer = ScreenCapturer(scale_provider=get_pixel_scale)
         self.output = OutputWriter(Path.cwd() / "output")
-        self.recognizer: Optional[ORBItemRecognizer] = None
+        self.templates: Dict[str, TemplateEntry] = {}
+        self.recognizer: Optional[Recognizer] = None
+        self._build_thread: Optional[QtCore.QThread] = None
+        self._build_progress: Optional[QtWidgets.QProgressDialog] = None
+        self._after_prepare: Optional[Callable[[], None]] = None
+        self.thresholds = Thresholds()
+        self.item_priors: Dict[str, float] = {}
+        self.empty_edge_max = 0.02
+        self.empty_reference = ""
+        self.session_specs: List[SourceSpec] = []
+        # Source numbers are never reused: names key the output folders and rows
+        self._next_source = 1
+        self.session: Optional[CaptureSession] = None
+        self.recorder: Optional[SessionRecorder] = None
+        self._session_rows: Dict[str, List[ResultRow]] = {}
+        self._session_bridge = SessionBridge(self)
+        self._session_bridge.result.connect(self._on_session_result)
+        self._session_bridge.memory_report.connect(self._on_memory_report)
+        self.memwatch: Optional[MemoryWatcher] = None
 
         central = QtWidgets.QWidget(self)
         self.setCentralWidget(central)
@@ -55,6 +145,8 @@ class MainWindow(QtWidgets.QMainWindow):
         self.btn_start = QtWidgets.QPushButton("Старт")
         self.btn_stop = QtWidgets.QPushButton("Стоп")
         self.btn_stop.setEnabled(False)
+        self.chk_record = QtWidgets.QCheckBox("Запись кропов")
+        self.chk_record.setToolTip("Сохранять кропы каждого тика в output/recordings (одинаковые кропы хранятся один раз)")
 
         # Source selection
         self.combo_source = QtWidgets.QComboBox()
@@ -77,6 +169,7 @@ class MainWindow(QtWidgets.QMainWindow):
         controls.addWidget(self.btn_remove_roi, 2, 1)
         controls.addWidget(self.btn_start, 2, 2)
         controls.addWidget(self.btn_stop, 2, 3)
+        controls.addWidget(self.chk_record, 2, 4)
 
         left_layout.addLayout(controls)
 
@@ -84,6 +177,17 @@ class MainWindow(QtWidgets.QMainWindow):
         self.list_rois = QtWidgets.QListWidget()
         left_layout.addWidget(self.list_rois, 1)
 
+        # Multi-source session: every source runs its own capture worker
+        group_session = QtWidgets.QGroupBox("Сессия (несколько источников)")
+        session_layout = QtWidgets.QGridLayout(group_session)
+        self.list_sources = QtWidgets.QListWidget()
+        self.btn_add_source = QtWidgets.QPushButton("Добавить текущий источник")
+        self.btn_remove_source = QtWidgets.QPushButton("Удалить источник")
+        session_layout.addWidget(self.list_sources, 0, 0, 1, 2)
+        session_layout.addWidget(self.btn_add_source, 1, 0)
+        session_layout.addWidget(self.btn_remove_source, 1, 1)
+        left_layout.addWidget(group_session)
+
         main_layout.addWidget(left, 2)
 
         # Right panel (preview and thresholds)
@@ -98,13 +202,41 @@ class MainWindow(QtWidgets.QMainWindow):
         self.dspin_corr.setRange(0.0, 1.0)
         self.dspin_corr.setSingleStep(0.05)
         self.dspin_corr.setValue(0.5)
+        self.combo_recognizer = QtWidgets.QComboBox()
+        self.combo_recognizer.addItem("ORB (ключевые точки)", "orb")
+        self.combo_recognizer.addItem("Embedding (ближайший сосед)", "emb")
+        self.chk_freq_search = QtWidgets.QCheckBox("Частые предметы первыми")
+        self.dspin_early_exit = QtWidgets.QDoubleSpinBox()
+        self.dspin_early_exit.setRange(0.0, 500.0)
+        self.dspin_early_exit.setSingleStep(1.0)
+        self.dspin_early_exit.setValue(0.0)
+        self.dspin_early_exit.setEnabled(False)
+        self.dspin_early_exit.setToolTip(
+            "Остановить поиск на первом шаблоне с таким числом good matches. Быстрее, но ответ может отличаться "
+            "от полного перебора (0 — только точная остановка)"
+        )
+        form.addRow("Распознаватель:", self.combo_recognizer)
+        form.addRow("Поиск ORB:", self.chk_freq_search)
+        form.addRow("Ранний выход (≥):", self.dspin_early_exit)
         form.addRow("ORB (good matches):", self.spin_orb)
         form.addRow("Correlation (0-1):", self.dspin_corr)
+        self.dspin_empty = QtWidgets.QDoubleSpinBox()
+        self.dspin_empty.setRange(0.0, 64.0)
+        self.dspin_empty.setSingleStep(1.0)
+        self.dspin_empty.setValue(0.0)
+        self.dspin_empty.setToolTip("Слот считается пустым, если σ яркости не больше порога и почти нет границ (0 — выключено)")
+        form.addRow("Пустой слот (σ ≤):", self.dspin_empty)
         right_layout.addWidget(group_thresh)
 
-        self.list_preview = QtWidgets.QListWidget()
+        self.results_model = ResultsTableModel(self)
+        self.table_preview = QtWidgets.QTableView()
+        self.table_preview.setModel(self.results_model)
+        self.table_preview.verticalHeader().setVisible(False)
+        self.table_preview.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
+        self.table_preview.setSelectionMode(QtWidgets.QAbstractItemView.NoSelection)
+        self.table_preview.horizontalHeader().setSectionResizeMode(QtWidgets.QHeaderView.Stretch)
         right_layout.addWidget(QtWidgets.QLabel("Последние распознавания:"))
-        right_layout.addWidget(self.list_preview, 1)
+        right_layout.addWidget(self.table_preview, 1)
 
         # Preview label
         self.preview_label = QtWidgets.QLabel()
@@ -124,6 +256,9 @@ class MainWindow(QtWidgets.QMainWindow):
         act_save = file_menu.addAction("Сохранить профиль…")
         act_load = file_menu.addAction("Загрузить профиль…")
         act_overlay = file_menu.addAction("Разметить окно…")
+        diag_menu = self.menuBar().addMenu("Диагностика")
+        self.act_memwatch = diag_menu.addAction("Мониторинг памяти")
+        self.act_memwatch.setCheckable(True)
 
         # Connections
         self.btn_load_templates.clicked.connect(self.on_choose_templates)
@@ -134,10 +269,20 @@ class MainWindow(QtWidgets.QMainWindow):
         act_save.triggered.connect(self.on_save_profile)
         act_load.triggered.connect(self.on_load_profile)
         act_overlay.triggered.connect(self.on_open_overlay)
+        self.act_memwatch.toggled.connect(self.on_toggle_memwatch)
         self.btn_overlay.clicked.connect(self.on_open_overlay)
         self.btn_refresh_sources.clicked.connect(self.refresh_sources)
         self.combo_source.currentIndexChanged.connect(self.refresh_sources)
         self.combo_detail.currentIndexChanged.connect(self.update_preview)
+        self.combo_recognizer.currentIndexChanged.connect(self.rebuild_recognizer)
+        self.chk_freq_search.toggled.connect(self._configure_recognizer)
+        self.chk_freq_search.toggled.connect(self.dspin_early_exit.setEnabled)
+        self.dspin_early_exit.valueChanged.connect(self._configure_recognizer)
+        self.dspin_empty.valueChanged.connect(self._configure_recognizer)
+        self.spin_orb.valueChanged.connect(self._sync_thresholds)
+        self.dspin_corr.valueChanged.connect(self._sync_thresholds)
+        self.btn_add_source.clicked.connect(self.on_add_source)
+        self.btn_remove_source.clicked.connect(self.on_remove_source)
 
         # Timer for recognition loop
         self.timer = QtCore.QTimer(self)
@@ -201,12 +346,130 @@ class MainWindow(QtWidgets.QMainWindow):
         if dir_path:
             self.templates_dir = Path(dir_path)
             self.lbl_templates.setText(str(self.templates_dir))
-            templates = load_templates(self.templates_dir)
-            if not templates:
-                QtWidgets.QMessageBox.warning(self, "Пустая папка", "В папке нет изображений шаблонов")
+            self._start_recognizer_build(self.templates_dir)
+
+    def rebuild_recognizer(self) -> None:
+        if not self.templates:
+            return
+        self._start_recognizer_build(self.templates_dir)
+
+    def _start_recognizer_build(self, templates_dir: Optional[Path]) -> None:
+        if self._build_thread is not None and self._build_thread.isRunning():
+            self.status.showMessage("Загрузка шаблонов уже выполняется", 2000)
+            return
+        kind = self.combo_recognizer.currentData()
+        if templates_dir is not None:
+            # Recently used directories are served from the process-wide pool
+            from core.recognizer_pool import get_pool
+            cached = get_pool().lookup(templates_dir, kind)
+            if cached is not None:
+                self._apply_recognizer(cached[0], cached[1])
                 return
-            self.recognizer = ORBItemRecognizer(templates)
-            self.status.showMessage("Шаблоны загружены", 3000)
+        self._show_build_progress("Загрузка шаблонов…")
+        thread = RecognizerBuildThread(kind, templates_dir, self.templates, self)
+        thread.progress.connect(self._on_build_progress)
+        thread.built.connect(self._on_recognizer_built)
+        thread.failed.connect(self._on_build_failed)
+        thread.finished.connect(thread.deleteLater)
+        self._build_thread = thread
+        thread.start()
+
+    def _show_build_progress(self, text: str) -> None:
+        self.btn_start.setEnabled(False)
+        self.btn_load_templates.setEnabled(False)
+        dlg = QtWidgets.QProgressDialog(text, None, 0, 0, self)
+        dlg.setWindowTitle("Шаблоны")
+        dlg.setWindowModality(QtCore.Qt.WindowModal)
+        dlg.setMinimumDuration(300)
+        self._build_progress = dlg
+
+    def _on_build_progress(self, stage: str, done: int, total: int) -> None:
+        if self._build_progress is None:
+            return
+        self._build_progress.setLabelText(f"{STAGE_LABELS.get(stage, stage)}: {done}/{total}")
+        self._build_progress.setMaximum(max(1, total))
+        self._build_progress.setValue(done)
+
+    def _finish_build(self) -> None:
+        if self._build_progress is not None:
+            self._build_progress.close()
+            self._build_progress = None
+        self._build_thread = None
+        self.btn_load_templates.setEnabled(True)
+        self.btn_start.setEnabled(not self.timer.isActive())
+
+    def _on_recognizer_built(self, templates: Dict[str, TemplateEntry], recognizer: Optional[Recognizer]) -> None:
+        self._finish_build()
+        if recognizer is None:
+            QtWidgets.QMessageBox.warning(self, "Пустая папка", "В папке нет изображений шаблонов")
+            return
+        self._apply_recognizer(templates, recognizer)
+
+    def _apply_recognizer(self, templates: Dict[str, TemplateEntry], recognizer: Recognizer) -> None:
+        self.templates = templates
+        self.recognizer = recognizer
+        self._reset_frequency()
+        self._configure_recognizer()
+        self.status.showMessage(f"Шаблоны загружены: {len(templates)} ({recognizer.nbytes() / 1e6:.1f} МБ)", 3000)
+        if self.timer.isActive():
+            # Swapped while running: ticks pause until its features are ready
+            self._prepare_recognizer(lambda: None)
+
+    def _tick_shapes(self) -> List[Tuple[int, int]]:
+        # Crop shapes on_tick will recognize in the current source mode
+        if self.combo_source.currentText() == "ROI (ручной выбор)":
+            return list({self.capturer.grab_bgr(e.rect).shape[:2] for e in self.rois})
+        qimg = self._grab_selected_source()
+        return [] if qimg is None else [(qimg.height(), qimg.width())]
+
+    def _prepare_recognizer(self, then: Callable[[], None]) -> None:
+        # Size-adaptive ORB extracts template features per crop size class;
+        # missing ones are built here with progress instead of on the first tick
+        recognizer = self.recognizer
+        shapes = [s for s in self._tick_shapes() if not recognizer.prepared(s)] if hasattr(recognizer, "prepared") else []
+        if not shapes:
+            then()
+            return
+        self._show_build_progress("Подготовка признаков…")
+        self._after_prepare = then
+        thread = RecognizerPrepareThread(recognizer, shapes, self)
+        thread.progress.connect(self._on_build_progress)
+        thread.prepared.connect(self._on_recognizer_prepared)
+        thread.failed.connect(self._on_build_failed)
+        thread.finished.connect(thread.deleteLater)
+        self._build_thread = thread
+        thread.start()
+
+    def _on_recognizer_prepared(self) -> None:
+        self._finish_build()
+        then, self._after_prepare = self._after_prepare, None
+        if then is not None:
+            then()
+
+    def _configure_recognizer(self) -> None:
+        if self.recognizer is None:
+            return
+        from core.empty_slot import make_empty_detector
+        from core.recognizer import ORBItemRecognizer
+        self.recognizer.empty_detector = make_empty_detector(
+            float(self.dspin_empty.value()), self.empty_edge_max, self.empty_reference
+        )
+        if isinstance(self.recognizer, ORBItemRecognizer):
+            self.recognizer.search = "frequency" if self.chk_freq_search.isChecked() else "full"
+            self.recognizer.early_exit_score = float(self.dspin_early_exit.value()) or None
+
+    def _reset_frequency(self) -> None:
+        # Recognizers are shared through the process-wide pool, so the previous
+        # profile's hit history and priors are dropped, even when the current
+        # profile has no priors of its own
+        from core.recognizer import ORBItemRecognizer
+        if isinstance(self.recognizer, ORBItemRecognizer):
+            self.recognizer.frequency.reset(self.item_priors)
+
+    def _on_build_failed(self, error: str) -> None:
+        self._finish_build()
+        self._after_prepare = None
+        QtWidgets.QMessageBox.warning(self, "Шаблоны", f"Не удалось загрузить шаблоны: {error}")
 
     def on_add_roi(self) -> None:
         if self.combo_source.currentText() != "ROI (ручной выбор)":
@@ -225,24 +488,154 @@ class MainWindow(QtWidgets.QMainWindow):
             del self.rois[idx]
             self.refresh_roi_list()
 
+    def _sync_thresholds(self) -> None:
+        self.thresholds.orb_min = float(self.spin_orb.value())
+        self.thresholds.corr_min = float(self.dspin_corr.value())
+
+    def on_add_source(self) -> None:
+        mode_data = self.combo_detail.currentData()
+        if not mode_data:
+            return
+        mode, val = mode_data
+        n = self._next_source
+        if mode == "roi":
+            if not self.rois:
+                QtWidgets.QMessageBox.warning(self, "Нет ROIs", "Добавьте хотя бы один ROI")
+                return
+            spec = SourceSpec(name=f"S{n} ROI x{len(self.rois)}", kind="roi", rois=[e.rect for e in self.rois])
+        else:
+            layouts = ["Весь кадр", "Табло MLBB (10 зон × 6 слотов)"]
+            layout, ok = QtWidgets.QInputDialog.getItem(self, "Зоны источника", "Разметка:", layouts, 0, False)
+            if not ok:
+                return
+            spec = SourceSpec(name=f"S{n} {self.combo_detail.currentText()}", kind=mode, target=val)
+            if layout == layouts[1]:
+                from core.zone_template import mlbb_scoreboard_10
+                spec.zones = mlbb_scoreboard_10()
+                spec.slots_per_zone = 6
+        self._next_source += 1
+        self.session_specs.append(spec)
+        self.list_sources.addItem(spec.name)
+
+    def on_remove_source(self) -> None:
+        idx = self.list_sources.currentRow()
+        if 0 <= idx < len(self.session_specs) and self.session is None:
+            del self.session_specs[idx]
+            self.list_sources.takeItem(idx)
+
     def on_start(self) -> None:
         if not self.templates_dir or self.recognizer is None:
             QtWidgets.QMessageBox.warning(self, "Нет шаблонов", "Сначала выберите папку с шаблонами")
             return
+        if self.session_specs:
+            self._start_recording()
+            self._start_session()
+            return
         if self.combo_source.currentText() == "ROI (ручной выбор)" and not self.rois:
             QtWidgets.QMessageBox.warning(self, "Нет ROIs", "Добавьте хотя бы один ROI")
             return
+        self._prepare_recognizer(self._start_timer)
+
+    def _start_timer(self) -> None:
+        self._start_recording()
         self.btn_start.setEnabled(False)
         self.btn_stop.setEnabled(True)
         self.timer.start()
         self.status.showMessage("Запущено", 2000)
 
+    def _start_recording(self) -> None:
+        if self.chk_record.isChecked() and self.recorder is None:
+            rec_dir = self.output.out_dir / "recordings" / time.strftime("%Y%m%d-%H%M%S")
+            self.recorder = SessionRecorder(rec_dir)
+        self.chk_record.setEnabled(False)
+
+    def _stop_recording(self) -> None:
+        self.chk_record.setEnabled(True)
+        if self.recorder is None:
+            return
+        rec = self.recorder
+        self.recorder = None
+        rec.close()
+        self.status.showMessage(
+            f"Запись: уникальных кропов {rec.stored_blobs}, повторов {rec.deduplicated}, пропущено тиков {rec.dropped_ticks}",
+            5000,
+        )
+
+    def _start_session(self) -> None:
+        self._sync_thresholds()
+        self._session_rows = {spec.name: [] for spec in self.session_specs}
+        self.results_model.clear()
+        self.session = CaptureSession(
+            list(self.session_specs),
+            self.recognizer,
+            self.thresholds,
+            self.output.out_dir,
+            self._session_bridge.result.emit,
+            interval_s=self.timer.interval() / 1000.0,
+            pixel_scale=get_pixel_scale(),
+            recorder=self.recorder,
+        )
+        self.session.start()
+        self.btn_start.setEnabled(False)
+        self.btn_stop.setEnabled(True)
+        self.btn_remove_source.setEnabled(False)
+        self.status.showMessage(f"Запущено источников: {len(self.session_specs)}", 2000)
+
+    def _on_session_result(self, result: SourceResult) -> None:
+        if self.session is None:
+            return
+        if result.error:
+            self.status.showMessage(f"{result.source}: ошибка: {result.error}", 2000)
+            return
+        self._session_rows[result.source] = [
+            ResultRow(f"{result.source}: {s.label}", s.name, s.method, s.score) for s in result.slots
+        ]
+        rows: List[ResultRow] = []
+        for spec in self.session_specs:
+            rows.extend(self._session_rows.get(spec.name, []))
+        self.results_model.update_rows(rows)
+
     def on_stop(self) -> None:
         self.btn_start.setEnabled(True)
         self.btn_stop.setEnabled(False)
         if self.timer.isActive():
             self.timer.stop()
+        if self.session is not None:
+            self.session.stop()
+            self.session = None
+            self.btn_remove_source.setEnabled(True)
         self.status.showMessage("Остановлено", 2000)
+        self._stop_recording()
+
+    def closeEvent(self, event: QtGui.QCloseEvent) -> None:
+        if self.session is not None:
+            self.session.stop()
+            self.session = None
+        self._stop_recording()
+        if self.memwatch is not None:
+            self.memwatch.stop()
+            self.memwatch = None
+        super().closeEvent(event)
+
+    def on_toggle_memwatch(self, enabled: bool) -> None:
+        if enabled and self.memwatch is None:
+            self.memwatch = MemoryWatcher(interval_s=30.0, on_report=self._session_bridge.memory_report.emit)
+            self.memwatch.start()
+            self.status.showMessage("Мониторинг памяти включён (отчёт каждые 30 с)", 3000)
+        elif not enabled and self.memwatch is not None:
+            self.memwatch.stop()
+            self.memwatch = None
+            self.status.showMessage("Мониторинг памяти выключен", 3000)
+
+    def _on_memory_report(self, report: MemoryReport) -> None:
+        diag_dir = self.output.out_dir / "diagnostics"
+        diag_dir.mkdir(parents=True, exist_ok=True)
+        with (diag_dir / "memory.log").open("a", encoding="utf-8") as f:
+            f.write(time.strftime("%Y-%m-%d %H:%M:%S") + " " + report.format() + "\n")
+        msg = f"Память: RSS {report.rss_mb:.0f} МБ, тренд {report.growth_mb_per_h:+.1f} МБ/ч"
+        if report.warning:
+            msg = "Утечка памяти? " + msg
+        self.status.showMessage(msg, 10000 if report.warning else 3000)
 
     def refresh_roi_list(self) -> None:
         self.list_rois.clear()
@@ -252,34 +645,38 @@ class MainWindow(QtWidgets.QMainWindow):
             self.list_rois.addItem(item_text)
 
     def on_tick(self) -> None:
-        if self.recognizer is None:
+        if self.recognizer is None or isinstance(self._build_thread, RecognizerPrepareThread):
             return
         mode = self.combo_source.currentText()
         items: List[str] = []
-        self.list_preview.clear()
+        rows: List[ResultRow] = []
         try:
             if mode == "ROI (ручной выбор)":
-                for entry in self.rois:
-                    frame = self.capturer.grab_bgr(entry.rect)
+                crops = [(entry.label, self.capturer.grab_bgr(entry.rect)) for entry in self.rois]
+                if self.recorder is not None:
+                    self.recorder.record("ROI", crops)
+                for (_label, frame), entry in zip(crops, self.rois):
                     detected = self.recognizer.recognize(frame)
-                    name = self._apply_thresholds(detected.score, detected.method, detected.name)
+                    name = apply_thresholds(detected, self.thresholds)
                     items.append(name)
-                    self.list_preview.addItem(
-                        f"{entry.label}: {name} (method={detected.method}, score={detected.score:.2f})"
-                    )
+                    rows.append(ResultRow(entry.label, name, detected.method, detected.score))
             else:
                 # Full-frame recognition yields best-matching item name for the whole source
                 qimg = self._grab_selected_source()
                 if qimg is not None:
                     frame = self._qimage_to_bgr(qimg)
+                    if self.recorder is not None:
+                        self.recorder.record("Источник", [("Источник", frame)])
                     detected = self.recognizer.recognize(frame)
-                    name = self._apply_thresholds(detected.score, detected.method, detected.name)
+                    name = apply_thresholds(detected, self.thresholds)
                     items.append(name)
-                    self.list_preview.addItem(
-                        f"Источник: {name} (method={detected.method}, score={detected.score:.2f})"
-                    )
+                    rows.append(ResultRow("Источник", name, detected.method, detected.score))
             self.output.write(items)
-            self.status.showMessage("Обновлено: " + ", ".join(items), 500)
+            # Only touch the view and the status bar when a result actually changed
+            prev_items = self.results_model.names()
+            self.results_model.update_rows(rows)
+            if items != prev_items:
+                self.status.showMessage("Обновлено: " + ", ".join(items), 500)
         except Exception as e:
             self.status.showMessage(f"Ошибка: {e}", 2000)
         self.update_preview()
@@ -293,20 +690,22 @@ class MainWindow(QtWidgets.QMainWindow):
         arr = np.frombuffer(ptr, np.uint8).reshape((h, w, 3))
         return arr[:, :, ::-1].copy()
 
-    def _apply_thresholds(self, score: float, method: str, name: str) -> str:
-        if method == "orb":
-            if score < float(self.spin_orb.value()):
-                return "Unknown"
-        else:
-            if score < float(self.dspin_corr.value()):
-                return "Unknown"
-        return name
-
     def on_save_profile(self) -> None:
         path_str, _ = QtWidgets.QFileDialog.getSaveFileName(self, "Сохранить профиль", str(Path.cwd() / "profile.json"), "JSON (*.json)")
         if not path_str:
             return
-        prof = Profile(templates_dir=str(self.templates_dir or ""), rois=[e.rect for e in self.rois])
+        priors = self.item_priors
+        if hasattr(self.recognizer, "frequency"):
+            priors = self.recognizer.frequency.snapshot() or priors
+        prof = Profile(
+            templates_dir=str(self.templates_dir or ""),
+            rois=[e.rect for e in self.rois],
+            item_priors=priors,
+            early_exit_score=float(self.dspin_early_exit.value()),
+            empty_std_max=float(self.dspin_empty.value()),
+            empty_edge_max=self.empty_edge_max,
+            empty_reference=self.empty_reference,
+        )
         prof.to_file(Path(path_str))
         self.status.showMessage("Профиль сохранён", 3000)
 
@@ -315,12 +714,18 @@ class MainWindow(QtWidgets.QMainWindow):
         if not path_str:
             return
         prof = Profile.from_file(Path(path_str))
+        self.item_priors = prof.item_priors
+        self.empty_edge_max = prof.empty_edge_max
+        self.empty_reference = prof.empty_reference
+        self.dspin_empty.setValue(prof.empty_std_max)
+        self.dspin_early_exit.setValue(prof.early_exit_score)
         self.templates_dir = Path(prof.templates_dir) if prof.templates_dir else None
         if self.templates_dir and self.templates_dir.exists():
             self.lbl_templates.setText(str(self.templates_dir))
-            templates = load_templates(self.templates_dir)
-            if templates:
-                self.recognizer = ORBItemRecognizer(templates)
+            self._start_recognizer_build(self.templates_dir)
+        else:
+            self._reset_frequency()
+            self._configure_recognizer()
         self.rois = [ROIEntry(rect=r, label=f"ROI {i+1}") for i, r in enumerate(prof.rois)]
         self.refresh_roi_list()
         self.status.showMessage("Профиль загружен", 3000)
@@ -341,7 +746,7 @@ class MainWindow(QtWidgets.QMainWindow):
         hwnd = wins[idx][0]
         # Use default MLBB-like 10-zone template
         from window_overlay import WindowZonesOverlay
-        from zone_template import mlbb_scoreboard_10
+        from core.zone_template import mlbb_scoreboard_10
         frame = self.capturer.grab_window_bgr(hwnd)
         if frame is None:
             QtWidgets.QMessageBox.warning(self, "Захват окна", "Не удалось захватить окно")
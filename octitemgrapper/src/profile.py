@@ -1,22 +1,37 @@
 from __future__ import annotations
 
 import json
-from dataclasses import asdict, dataclass
+from dataclasses import asdict, dataclass, field
 from pathlib import Path
-from typing import List
+from typing import Dict, List
 
-from roi_selector import Rect
+from core.geometry import Rect
 
 
 @dataclass
 class Profile:
     templates_dir: str
     rois: List[Rect]
+    # Relative recognition frequency per item, used to order the template search
+    item_priors: Dict[str, float] = field(default_factory=dict)
+    # Frequency search stops at the first ORB score this high (0 = only the
+    # exact bound, same answer as a full scan)
+    early_exit_score: float = 0.0
+    # Empty-slot fast path: brightness std / edge-density limits (std 0 = off)
+    # and an optional image of the layout's empty slot background
+    empty_std_max: float = 0.0
+    empty_edge_max: float = 0.02
+    empty_reference: str = ""
 
     def to_json(self) -> str:
         obj = {
             "templates_dir": self.templates_dir,
             "rois": [asdict(r) for r in self.rois],
+            "item_priors": self.item_priors,
+            "early_exit_score": self.early_exit_score,
+            "empty_std_max": self.empty_std_max,
+            "empty_edge_max": self.empty_edge_max,
+            "empty_reference": self.empty_reference,
         }
         return json.dumps(obj, ensure_ascii=False, indent=2)
 
@@ -24,7 +39,16 @@ class Profile:
     def from_file(path: Path) -> "Profile":
         data = json.loads(path.read_text(encoding="utf-8"))
         rois = [Rect(**r) for r in data.get("rois", [])]
-        return Profile(templates_dir=data.get("templates_dir", ""), rois=rois)
+        priors = {str(k): float(v) for k, v in data.get("item_priors", {}).items()}
+        return Profile(
+            templates_dir=data.get("templates_dir", ""),
+            rois=rois,
+            item_priors=priors,
+            early_exit_score=float(data.get("early_exit_score", 0.0)),
+            empty_std_max=float(data.get("empty_std_max", 0.0)),
+            empty_edge_max=float(data.get("empty_edge_max", 0.02)),
+            empty_reference=data.get("empty_reference", ""),
+        )
 
     def to_file(self, path: Path) -> None:
         path.parent.mkdir(parents=True, exist_ok=True)
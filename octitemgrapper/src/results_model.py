@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any, List, Optional, Set
+
+from PyQt5 import QtCore
+
+
+@dataclass
+class ResultRow:
+    label: str
+    name: str
+    method: str
+    score: float
+
+    def key(self) -> tuple:
+        # Compare at display precision so score jitter below 0.01 is not a change
+        return (self.label, self.name, self.method, round(self.score, 2))
+
+
+class ResultsTableModel(QtCore.QAbstractTableModel):
+    HEADERS = ("Слот", "Предмет", "Метод", "Оценка")
+
+    def __init__(self, parent: Optional[QtCore.QObject] = None, min_repaint_ms: int = 200) -> None:
+        super().__init__(parent)
+        self._rows: List[ResultRow] = []
+        self._dirty: Set[int] = set()
+        # Coalesce dataChanged notifications so views repaint at most once per interval
+        self._flush_timer = QtCore.QTimer(self)
+        self._flush_timer.setSingleShot(True)
+        self._flush_timer.setInterval(min_repaint_ms)
+        self._flush_timer.timeout.connect(self._flush)
+
+    def rowCount(self, parent: QtCore.QModelIndex = QtCore.QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent: QtCore.QModelIndex = QtCore.QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def data(self, index: QtCore.QModelIndex, role: int = QtCore.Qt.DisplayRole) -> Any:
+        if not index.isValid() or role != QtCore.Qt.DisplayRole:
+            return None
+        row = self._rows[index.row()]
+        col = index.column()
+        if col == 0:
+            return row.label
+        if col == 1:
+            return row.name
+        if col == 2:
+            return row.method
+        return f"{row.score:.2f}"
+
+    def headerData(self, section: int, orientation: QtCore.Qt.Orientation, role: int = QtCore.Qt.DisplayRole) -> Any:
+        if role == QtCore.Qt.DisplayRole and orientation == QtCore.Qt.Horizontal:
+            return self.HEADERS[section]
+        return None
+
+    def names(self) -> List[str]:
+        return [r.name for r in self._rows]
+
+    def update_rows(self, rows: List[ResultRow]) -> bool:
+        # Returns True when anything visible changed
+        if len(rows) != len(self._rows):
+            self._flush_timer.stop()
+            self._dirty.clear()
+            self.beginResetModel()
+            self._rows = list(rows)
+            self.endResetModel()
+            return True
+        changed = False
+        for i, row in enumerate(rows):
+            if row.key() != self._rows[i].key():
+                self._rows[i] = row
+                self._dirty.add(i)
+                changed = True
+        if self._dirty and not self._flush_timer.isActive():
+            self._flush_timer.start()
+        return changed
+
+    def clear(self) -> None:
+        self.update_rows([])
+
+    def _flush(self) -> None:
+        if not self._dirty:
+            return
+        top = min(self._dirty)
+        bottom = max(self._dirty)
+        self._dirty.clear()
+        self.dataChanged.emit(
+            self.index(top, 0), self.index(bottom, len(self.HEADERS) - 1), [QtCore.Qt.DisplayRole]
+        )
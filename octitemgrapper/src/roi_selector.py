@@ -1,17 +1,10 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
 from typing import Optional, Tuple
 
 from PyQt5 import QtCore, QtGui, QtWidgets
 
-
-@dataclass
-class Rect:
-    x: int
-    y: int
-    width: int
-    height: int
+from core.geometry import Rect
 
 
 class ROISelectorDialog(QtWidgets.QDialog):
@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+import argparse
+import sys
+import tempfile
+from pathlib import Path
+from typing import List, Optional
+
+import cv2
+import numpy as np
+
+from core.memwatch import MemoryWatcher
+from core.output_writer import OutputWriter
+from core.recognizer import ORBItemRecognizer
+from core.session import Thresholds, apply_thresholds
+from core.templates_loader import load_templates
+
+
+# Memory soak: drives recognizer + thresholds + output for many synthetic ticks
+# and fails (exit code 1) when memory keeps growing after warm-up.
+def make_templates(directory: Path, count: int, size: int, seed: int) -> None:
+    rng = np.random.default_rng(seed)
+    for i in range(count):
+        img = np.full((size, size, 3), 30, dtype=np.uint8)
+        for _ in range(6):
+            center = (int(rng.integers(4, size - 4)), int(rng.integers(4, size - 4)))
+            color = tuple(int(c) for c in rng.integers(0, 255, 3))
+            cv2.circle(img, center, int(rng.integers(3, max(4, size // 5))), color, -1)
+        cv2.imwrite(str(directory / f"item{i:04d}.png"), img)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Check that memory stays flat over many synthetic ticks")
+    ap.add_argument("--ticks", type=int, default=1200)
+    ap.add_argument("--slots", type=int, default=12)
+    ap.add_argument("--templates", type=int, default=100)
+    ap.add_argument("--size", type=int, default=48)
+    ap.add_argument("--sample-every", type=int, default=150)
+    ap.add_argument("--warmup-samples", type=int, default=2)
+    ap.add_argument("--limit-mb", type=float, default=8.0, help="allowed RSS growth after warm-up")
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tpl_dir = Path(tmp) / "templates"
+        tpl_dir.mkdir()
+        make_templates(tpl_dir, args.templates, args.size, args.seed)
+        templates = load_templates(tpl_dir)
+        recognizer = ORBItemRecognizer(templates)
+        images = [templates[name].image_bgr for name in templates]
+        output = OutputWriter(Path(tmp) / "output")
+        thresholds = Thresholds()
+        watcher = MemoryWatcher(warmup_samples=args.warmup_samples, nframes=1)
+        # Sampled from the loop below only, at fixed tick counts
+        watcher.start(thread=False)
+        rng = np.random.default_rng(args.seed + 1)
+        report = None
+        try:
+            for tick in range(1, args.ticks + 1):
+                items: List[str] = []
+                for _ in range(args.slots):
+                    img = images[int(rng.integers(0, len(images)))]
+                    side = int(rng.integers(args.size - 6, args.size + 7))
+                    crop = cv2.resize(img, (side, side), interpolation=cv2.INTER_AREA)
+                    items.append(apply_thresholds(recognizer.recognize(crop), thresholds))
+                output.write(items)
+                if tick % args.sample_every == 0:
+                    report = watcher.sample()
+                    print(f"tick {tick:6d}: RSS {report.rss_mb:7.1f} MB, traced {report.traced_mb:6.2f} MB")
+        finally:
+            watcher.stop()
+
+    steady = watcher.samples[args.warmup_samples :]
+    if len(steady) < 2 or report is None:
+        print("Not enough samples after warm-up; increase --ticks or lower --sample-every", file=sys.stderr)
+        return 2
+    growth_mb = (steady[-1].rss - steady[0].rss) / 1e6
+    print(report.format())
+    print(f"RSS growth after warm-up: {growth_mb:+.2f} MB (limit {args.limit_mb:.2f} MB)")
+    return 0 if growth_mb <= args.limit_mb else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
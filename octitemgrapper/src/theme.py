@@ -36,7 +36,7 @@ def apply_dark_theme(app: QtWidgets.QApplication) -> None:
     app.setStyleSheet(
         """
         QToolTip { color: #ffffff; background-color: #2a82da; border: 1px solid white; }
-        QListWidget, QTreeWidget, QTableWidget { background-color: #2f2f2f; }
+        QListWidget, QTreeWidget, QTableWidget, QTableView { background-color: #2f2f2f; }
         QPushButton { padding: 5px 10px; }
         QGroupBox { border: 1px solid #3c3c3c; margin-top: 6px; }
         QGroupBox::title { subcontrol-origin: margin; left: 7px; padding: 0 3px 0 3px; }
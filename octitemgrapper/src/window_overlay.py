@@ -5,11 +5,11 @@ from typing import Callable, List, Optional, Tuple
 import numpy as np
 from PyQt5 import QtCore, QtGui, QtWidgets
 
-from capture import ScreenCapturer
-from recognizer import ORBItemRecognizer
-from output_writer import OutputWriter
-from roi_selector import Rect
-from zone_template import NRect, to_abs
+from core.capture import ScreenCapturer
+from core.geometry import Rect
+from core.output_writer import OutputWriter
+from core.recognizer import ORBItemRecognizer
+from core.zone_template import NRect, to_abs, zone_slots
 
 
 class WindowZonesOverlay(QtWidgets.QDialog):
@@ -100,23 +100,17 @@ class WindowZonesOverlay(QtWidgets.QDialog):
         ix = int((click.x() - x) / scale)
         iy = int((click.y() - y) / scale)
 
-		# Find zone index
-		for idx, nr in enumerate(self.zones):
-			ar = to_abs(nr, w, h)
-			if ar.x <= ix <= ar.x + ar.width and ar.y <= iy <= ar.y + ar.height:
-				# Split into 6 equal horizontal slots inside the zone with small padding
-				pad = int(0.04 * min(ar.width, ar.height))
-				slot_w = max(1, (ar.width - 2 * pad) // 6)
-				items: List[str] = []
-				for s in range(6):
-					sx = ar.x + pad + s * slot_w
-					sy = ar.y + pad
-					ew = slot_w
-					eh = max(1, ar.height - 2 * pad)
-					roi = frame[sy : sy + eh, sx : sx + ew]
-					detected = self.recognizer.recognize(roi)
-					items.append(detected.name)
-				# Write results for this zone
-				self.output.write_for_zone(idx + 1, items)
-				QtWidgets.QToolTip.showText(self.mapToGlobal(event.pos()), f"Зона {idx+1}: {', '.join(items)}")
-				break 
\ No newline at end of file
+        # Find zone index
+        for idx, nr in enumerate(self.zones):
+            ar = to_abs(nr, w, h)
+            if ar.x <= ix <= ar.x + ar.width and ar.y <= iy <= ar.y + ar.height:
+                # Split into 6 equal horizontal slots inside the zone with small padding
+                items: List[str] = []
+                for slot in zone_slots(ar, 6):
+                    roi = frame[slot.y : slot.y + slot.height, slot.x : slot.x + slot.width]
+                    detected = self.recognizer.recognize(roi)
+                    items.append(detected.name)
+                # Write results for this zone
+                self.output.write_for_zone(idx + 1, items)
+                QtWidgets.QToolTip.showText(self.mapToGlobal(event.pos()), f"Зона {idx+1}: {', '.join(items)}")
+                break 
\ No newline at end of file